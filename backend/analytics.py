@@ -0,0 +1,146 @@
+"""
+增量健康分析：每个 monitor 每秒喂一次当前状态，O(1) 更新，不回查历史
+- 连续久坐时长（有人开始到现在，短暂漏检不算离开）
+- 距上次看到水杯的分钟数
+- 最近 5/30/60 分钟的活动比例（有人的秒数里有活动的比例）
+- 连续通电时长（功率超过阈值）
+结果是不可变快照（整体替换引用），供推送循环、insights 和 AI 摘要读取
+
+只依赖标准库，可以直接运行压测：
+    python backend/analytics.py --monitors 500 --seconds 3600
+"""
+from dataclasses import dataclass, field
+
+ACTIVE_WINDOWS_MINUTES = (5, 30, 60)
+SITTING_ALERT_SECONDS = 60 * 60  # 连续久坐超过 1 小时提醒起身
+ABSENCE_GRACE_SECONDS = 30  # 连续无人超过该秒数才算离开，检测偶尔漏检一两秒不打断久坐计时
+WATER_ALERT_MINUTES = 60  # 有人在、超过 1 小时没看到水杯提醒喝水
+POWER_ON_WATTS = 5.0  # 功率超过该值认为设备通电工作
+
+# 每秒一格：0 无人/无数据, 1 有人但不活动, 2 有人且活动
+_NO_SAMPLE, _IDLE, _ACTIVE = 0, 1, 2
+
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    timestamp: int = 0
+    sitting_seconds: int = 0  # 连续有人的秒数，离开（连续无人超过 ABSENCE_GRACE_SECONDS）后为 0
+    minutes_since_cup: int | None = None  # 从未看到水杯时为 None
+    active_ratio: dict = field(default_factory=dict)  # 窗口分钟数 -> 活动比例(0~1)，窗口内无人时为 None
+    power_on_seconds: int = 0  # 连续通电秒数
+    alerts: tuple = ()  # "sedentary" / "hydration"
+
+
+class RollingActivity:
+    """按秒的环形缓冲区，每个窗口维护有人秒数和活动秒数的累加和，写入一秒只改 O(窗口数) 个计数"""
+
+    def __init__(self, windows_seconds: tuple):
+        self.windows = windows_seconds
+        self.size = max(windows_seconds)
+        self.ring = bytearray(self.size)
+        self.present = [0] * len(windows_seconds)
+        self.active = [0] * len(windows_seconds)
+        self.last_second = None
+
+    def push(self, second: int, value: int):
+        if self.last_second is not None and second <= self.last_second:
+            return  # 同一秒重复调用或时间回拨
+        # 中间缺的秒按无数据处理（最多补一整圈，再多就等于清空）
+        gap = 1 if self.last_second is None else min(second - self.last_second, self.size + 1)
+        for missing in range(second - gap + 1, second):
+            self._set(missing, _NO_SAMPLE)
+        self._set(second, value)
+        self.last_second = second
+
+    def _set(self, second: int, value: int):
+        for i, window in enumerate(self.windows):
+            # 移出窗口的那一秒
+            old = self.ring[(second - window) % self.size]
+            self.present[i] += (value != _NO_SAMPLE) - (old != _NO_SAMPLE)
+            self.active[i] += (value == _ACTIVE) - (old == _ACTIVE)
+        self.ring[second % self.size] = value
+
+    def ratios(self) -> list:
+        return [round(active / present, 3) if present else None
+                for active, present in zip(self.active, self.present)]
+
+
+class HealthAnalytics:
+    """单个 monitor 的增量分析状态（由 HealthAnalyze.tick 每秒调用 update）"""
+
+    def __init__(self):
+        self.activity = RollingActivity(tuple(minutes * 60 for minutes in ACTIVE_WINDOWS_MINUTES))
+        self.sitting_since = None
+        self.absent_since = None
+        self.cup_last_seen = None
+        self.power_on_since = None
+        self.snapshot = AnalyticsSnapshot()
+
+    def update(self, now: int, is_person_detected: bool, is_active: bool, is_cup_detected: bool,
+               power: float | None = None) -> AnalyticsSnapshot:
+        if is_person_detected:
+            self.absent_since = None
+            if self.sitting_since is None:
+                self.sitting_since = now
+        else:
+            if self.absent_since is None:
+                self.absent_since = now
+            if now - self.absent_since + 1 >= ABSENCE_GRACE_SECONDS:
+                self.sitting_since = None
+        if is_cup_detected:
+            self.cup_last_seen = now
+        if power is not None and power > POWER_ON_WATTS:
+            if self.power_on_since is None:
+                self.power_on_since = now
+        else:
+            self.power_on_since = None
+        self.activity.push(now, (_ACTIVE if is_active else _IDLE) if is_person_detected else _NO_SAMPLE)
+
+        sitting_seconds = now - self.sitting_since if self.sitting_since is not None else 0
+        minutes_since_cup = (now - self.cup_last_seen) // 60 if self.cup_last_seen is not None else None
+        alerts = []
+        if sitting_seconds >= SITTING_ALERT_SECONDS:
+            alerts.append("sedentary")
+        if is_person_detected and (minutes_since_cup is None or minutes_since_cup >= WATER_ALERT_MINUTES) \
+                and sitting_seconds >= WATER_ALERT_MINUTES * 60:
+            alerts.append("hydration")
+        self.snapshot = AnalyticsSnapshot(
+            timestamp=now,
+            sitting_seconds=sitting_seconds,
+            minutes_since_cup=minutes_since_cup,
+            active_ratio=dict(zip(ACTIVE_WINDOWS_MINUTES, self.activity.ratios())),
+            power_on_seconds=now - self.power_on_since if self.power_on_since is not None else 0,
+            alerts=tuple(alerts),
+        )
+        return self.snapshot
+
+
+def benchmark(monitors: int, seconds: int):
+    import random
+    import time
+
+    analytics = [HealthAnalytics() for _ in range(monitors)]
+    random.seed(0)
+    # 预先生成状态，只计 update 本身的耗时
+    states = [(random.random() < 0.8, random.random() < 0.5, random.random() < 0.3, random.uniform(0, 50))
+              for _ in range(1024)]
+    start_time = int(time.time())
+    started = time.perf_counter()
+    for second in range(seconds):
+        now = start_time + second
+        for i, item in enumerate(analytics):
+            item.update(now, *states[(second * 7 + i) & 1023])
+    elapsed = time.perf_counter() - started
+    updates = monitors * seconds
+    print(f"[Analytics] {monitors} 个 monitor × {seconds} 秒 = {updates} 次更新, "
+          f"每次 {elapsed / updates * 1e6:.2f} µs, 每秒一轮耗时 {elapsed / seconds * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="增量健康分析压测")
+    parser.add_argument("--monitors", type=int, default=500)
+    parser.add_argument("--seconds", type=int, default=3600, help="模拟的秒数")
+    args = parser.parse_args()
+    benchmark(args.monitors, args.seconds)
@@ -1,9 +1,10 @@
+import hmac
 import signal
 import threading
 import time
-from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import cv2
 import numpy as np
 from sqlalchemy.orm import Session
@@ -18,6 +19,9 @@ import pickle
 from ultralytics import YOLO
 
 from database import crud, get_db
+from backend.logger import log_writer
+from backend.metrics import metrics
+from backend.profiler import MAX_SECONDS, profile_lock, sample_threads
 
 # 路由
 from .monitor import router as monitor_router
@@ -34,6 +38,8 @@ async def lifespan(app: FastAPI):
 
     # 关闭时执行
     print("[Lifespan] 应用关闭中...")
+    # 写完队列里剩余的日志再退出
+    log_writer.close()
     os.kill(os.getpid(), signal.SIGTERM)
 
 # 创建FastAPI应用
@@ -62,5 +68,73 @@ async def get_monitors():
         "monitors": monitor_registry.monitors.keys(),
     }
 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus 文本格式的性能指标"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/summary")
+async def get_metrics_summary():
+    """各 monitor 的延迟分位数（p50/p95/p99）和计数，供设置页显示"""
+    return metrics.summary()
+
+
+# 设置后，非本机的请求带上 X-Profile-Token 头也可以 profiling；未设置时只允许本机访问
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_profile_access(request: Request):
+    """profiling 会采样所有线程并返回带源码路径的调用栈，只允许本机或持有令牌的客户端"""
+    if request.client is not None and request.client.host in LOOPBACK_HOSTS:
+        return
+    token = request.headers.get("x-profile-token")
+    if PROFILE_TOKEN and token and hmac.compare_digest(token, PROFILE_TOKEN):
+        return
+    raise HTTPException(status_code=403, detail="Profiling is only allowed from localhost or with a valid token")
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_profile_access)])
+async def profile_server(
+    mode: str = Query("sample", pattern="^(cprofile|sample)$"),
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    monitor: str | None = None,
+):
+    """
+    在线 profiling，不需要重启服务
+    mode=cprofile: 分析指定 monitor 的 VideoProcessor 处理线程，返回 .prof（pstats / snakeviz 打开）
+    mode=sample: 对所有线程（指定 monitor 时只对其处理线程）采样调用栈，返回 speedscope JSON
+    """
+    video_processor = None
+    if monitor is not None:
+        resolved_url = monitor_registry.resolve(monitor)
+        if resolved_url is None:
+            raise HTTPException(status_code=404, detail="Monitor not found")
+        video_processor = monitor_registry.monitors[resolved_url].video_processor
+    elif mode == "cprofile":
+        raise HTTPException(status_code=400, detail="cprofile mode requires monitor")
+
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Another profiling session is running")
+    try:
+        if mode == "cprofile":
+            future = video_processor.profiler.request(seconds)
+            try:
+                data = await asyncio.wait_for(asyncio.wrap_future(future), seconds + 10)
+            except asyncio.TimeoutError:
+                # 处理线程卡住了，撤销请求
+                video_processor.profiler.pending = None
+                raise HTTPException(status_code=504, detail="Processing thread did not respond")
+            return Response(data, media_type="application/octet-stream",
+                            headers={"Content-Disposition": 'attachment; filename="video_processor.prof"'})
+        thread_ids = {video_processor.processing_thread.ident} if video_processor else None
+        result = await asyncio.to_thread(sample_threads, seconds, thread_ids)
+        return Response(json.dumps(result), media_type="application/json",
+                        headers={"Content-Disposition": 'attachment; filename="profile.speedscope.json"'})
+    finally:
+        profile_lock.release()
+
 app.include_router(monitor_router)
 
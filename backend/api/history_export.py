@@ -0,0 +1,180 @@
+"""
+工作会话历史的分页和流式导出
+
+按 (start_time, id) 键集分页，每页在数据库线程池里单独查询，导出时逐页查询并编码（都在线程池里）、逐页发送，
+内存占用只与页大小有关，与导出的时间范围无关。
+"""
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException
+
+from database import crud, run_db
+
+# 导出 Parquet 需要 pyarrow（可选依赖）
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+SESSION_FIELDS = ("id", "start_time", "end_time", "duration_seconds", "monitor_video_url")
+EXPORT_FORMATS = ("ndjson", "csv", "parquet")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_PAGE_SIZE = 5000
+
+
+def encode_cursor(row) -> str:
+    return f"{row.start_time}_{row.id}"
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        start_time, session_id = cursor.split("_")
+        return int(start_time), int(session_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def session_to_dict(row, monitor_video_url: str) -> dict:
+    return {
+        "id": row.id,
+        "start_time": row.start_time,
+        "end_time": row.end_time,
+        "duration_seconds": row.duration_seconds,
+        "monitor_video_url": monitor_video_url,
+    }
+
+
+async def get_history_page(monitor_video_url: str, start_date_ts: int, end_date_ts: int,
+                           limit: int, cursor: Optional[str]) -> dict:
+    """一页历史会话，next_cursor 为 None 表示没有更多"""
+    after = decode_cursor(cursor) if cursor else None
+    # 多取一行用来判断是否还有下一页
+    rows = await run_db(crud.get_work_sessions_page, monitor_video_url, start_date_ts, end_date_ts,
+                        limit + 1, after)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "sessions": [session_to_dict(row, monitor_video_url) for row in rows],
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+    }
+
+
+class _ChunkSink:
+    """给 ParquetWriter 用的只追加输出，每写完一个 row group 取走已写的字节"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _TextEncoder:
+    """ndjson / csv 逐页编码，可选 gzip（在数据库线程池里调用，不占事件循环）"""
+
+    def __init__(self, fmt: str, monitor_video_url: str, gzip_enabled: bool):
+        self.fmt = fmt
+        self.monitor_video_url = monitor_video_url
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip_enabled else None  # wbits=31: gzip 格式
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        if fmt == "csv":
+            self.writer.writerow(SESSION_FIELDS)
+
+    def encode(self, rows: list) -> bytes:
+        if self.fmt == "csv":
+            for row in rows:
+                self.writer.writerow((row.id, row.start_time, row.end_time, row.duration_seconds,
+                                      self.monitor_video_url))
+            data = self.buffer.getvalue().encode("utf-8")
+            self.buffer.seek(0)
+            self.buffer.truncate()
+        else:
+            data = "".join(json.dumps(session_to_dict(row, self.monitor_video_url)) + "\n"
+                           for row in rows).encode("utf-8")
+        return self.compressor.compress(data) if self.compressor else data
+
+    def finish(self) -> bytes:
+        return self.compressor.flush() if self.compressor else b""
+
+
+class _ParquetEncoder:
+    """每页一个 row group，Parquet 自带列压缩，不再 gzip"""
+
+    def __init__(self, monitor_video_url: str):
+        self.monitor_video_url = monitor_video_url
+        self.schema = pa.schema([("id", pa.int64()), ("start_time", pa.int64()), ("end_time", pa.int64()),
+                                 ("duration_seconds", pa.int64()), ("monitor_video_url", pa.string())])
+        self.sink = _ChunkSink()
+        self.writer = None
+
+    def encode(self, rows: list) -> bytes:
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(pa.PythonFile(self.sink, mode="w"), self.schema, compression="zstd")
+        if rows:
+            self.writer.write_table(pa.table({
+                "id": [row.id for row in rows],
+                "start_time": [row.start_time for row in rows],
+                "end_time": [row.end_time for row in rows],
+                "duration_seconds": [row.duration_seconds for row in rows],
+                "monitor_video_url": [self.monitor_video_url] * len(rows),
+            }, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+async def stream_history_export(monitor_video_url: str, start_date_ts: int, end_date_ts: int,
+                                fmt: str, gzip_enabled: bool) -> AsyncIterator[bytes]:
+    """逐页查询、编码并（可选）gzip 压缩，作为 StreamingResponse 的 body；查询和编码都在数据库线程池里"""
+    if fmt == "parquet":
+        encoder = _ParquetEncoder(monitor_video_url)
+    else:
+        encoder = _TextEncoder(fmt, monitor_video_url, gzip_enabled)
+
+    def export_page(db, after):
+        """查一页并编码，返回 (字节, 下一页游标)，最后一页游标为 None"""
+        rows = crud.get_work_sessions_page(db, monitor_video_url, start_date_ts, end_date_ts,
+                                           EXPORT_PAGE_SIZE, after)
+        data = encoder.encode(rows)
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return data + encoder.finish(), None
+        return data, (rows[-1].start_time, rows[-1].id)
+
+    after = None
+    while True:
+        chunk, after = await run_db(export_page, after)
+        if chunk:
+            yield chunk
+        if after is None:
+            return
@@ -1,20 +1,31 @@
 import datetime
+import hashlib
 import os
+import re
 import time
 
-from database import crud, get_db
+from database import crud, get_db, run_db
+from database.timeseries import RESOLUTIONS, get_status_series
 import json
 import asyncio
 import cv2
 
 import urllib.parse
-from fastapi.responses import StreamingResponse
-from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect, Depends
+from dataclasses import dataclass, field
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, Request, Response, WebSocket, WebSocketDisconnect, Depends, Query
 from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
 
+from backend.metrics import metrics
 from backend.monitor import Monitor
 from backend.monitor_registry import MonitorRegistry
+from backend.signin_store import SigninImageStore
+from backend.tracing import tracer
+from backend.status_codec import (ENCODINGS, LANGUAGES, render_insights,
+                                  encode_binary_status, encode_binary_heartbeat)
+from .ws_client import WsClient
+from .history_export import EXPORT_FORMATS, MEDIA_TYPES, get_history_page, pq, stream_history_export
 from typing import Optional
 
 # 创建监视终端注册表
@@ -23,7 +34,7 @@ monitor_registry.register("udpserver://0.0.0.0:8099/192.168.10.100", current_sen
 # monitor_registry.register("udpserver://0.0.0.0:8099/192.168.10.102")
 
 # 存储所有连接的 WebSockets 客户端，按 video_url 分组
-connected_clients: dict[str, set[WebSocket]] = {}
+connected_clients: dict[str, set[WsClient]] = {}
 
 router = APIRouter(prefix="/monitor", tags=["monitor"])
 
@@ -32,80 +43,196 @@ def decode_monitor_url(request: Request, blur_video_url: str) -> tuple[str, Moni
     """
     依赖注入函数：解析video_url并返回Monitor实例
     返回 (resolved_url, Monitor)
+    每个请求和视频流连接都会调用，查找走 MonitorRegistry 的索引和 LRU 缓存
     """
 
     blur_video_url = urllib.parse.unquote(blur_video_url)
-    print(f"[/monitor/{blur_video_url}] 解析URL")
 
     # 特例：如果是 "MY"，则根据对端IP地址查找
     if blur_video_url == "MY":
-        blur_video_url = request.client.host
+        resolved_url = monitor_registry.resolve_by_ip(request.client.host)
+    else:
+        resolved_url = monitor_registry.resolve(blur_video_url)
 
-    # 首先检查直接匹配
-    if blur_video_url in monitor_registry.monitors:
-        monitor = monitor_registry.monitors[blur_video_url]
-        return blur_video_url, monitor
-
-    # 支持多个关键词模糊匹配（以连字符分隔）
-    keywords = [kw.strip() for kw in blur_video_url.split("-") if kw.strip()]
-    for existing_url in monitor_registry.monitors.keys():
-        if all(kw in existing_url for kw in keywords):
-            monitor = monitor_registry.monitors[existing_url]
-            return existing_url, monitor
-
-    raise HTTPException(
-        status_code=404, detail=f"Monitor not found")
+    if resolved_url is None:
+        print(f"[/monitor/{blur_video_url}] 未找到监视终端")
+        raise HTTPException(
+            status_code=404, detail=f"Monitor not found")
+    return resolved_url, monitor_registry.monitors[resolved_url]
 
 @router.get("/list")
 async def list_monitors():
     """获取所有监视终端的列表"""
     return list(monitor_registry.monitors.keys())
 
-@router.get("/{blur_video_url}/video_feed")
-async def monitor_video_feed(monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url)):
-    """指定监视终端的视频流"""
-    resolved_url, monitor = monitor_info
+@router.get("/status")
+async def get_all_status(request: Request):
+    """
+    一次性获取所有监视终端的状态（检测状态、功率、今日在岗时长），供总览页轮询
+    全部来自内存（检测快照 + 在岗时长累加器），不查数据库；内容没变时按 If-None-Match 返回 304
+    ETag 只看有意义的变化（功率取整到 1 W、时长按整分钟），有人在时每秒变化的秒数不会让每次轮询都重新下载
+    """
+    statuses = {}
+    etag_keys = []
+    for video_url, monitor in monitor_registry.monitors.items():
+        status = monitor.output_status()
+        power = status["power"]
+        etag_keys.append((
+            video_url, status["is_person_detected"], status["is_active"], status["is_cup_detected"],
+            None if power is None else round(power),
+            None if status["today_work_seconds"] is None else status["today_work_seconds"] // 60,
+            status["sitting_seconds"] // 60, status["alerts"],
+        ))
+        statuses[video_url] = {
+            "is_person_detected": status["is_person_detected"],
+            "is_active": status["is_active"],
+            "is_cup_detected": status["is_cup_detected"],
+            "power": status["power"],
+            "today_work_seconds": status["today_work_seconds"],
+            "sitting_seconds": status["sitting_seconds"],
+            "alerts": status["alerts"],
+        }
+    etag = f'"{hashlib.blake2b(repr(etag_keys).encode("utf-8"), digest_size=8).hexdigest()}"'
+    # If-None-Match 可以是逗号分隔的多个 ETag（可能带 W/ 前缀）或 *
+    if_none_match = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status_code=304, headers={"ETag": etag})
+    body = json.dumps(statuses, ensure_ascii=False).encode('utf-8')
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
-    async def generate():
-        while True:
-            if monitor.video_processor.yolo_detector is not None:
-                frame = monitor.video_processor.yolo_detector.result.draw_boxes_on(
-                    monitor.video_processor.get_latest_frame())
-            else:
-                frame = monitor.video_processor.get_latest_frame()
-            if frame is not None:
-                # 转换为JPEG
-                _, jpeg = cv2.imencode('.jpg', frame)
-                frame_bytes = jpeg.tobytes()
+SIGNIN_IMAGES_PATH = "backend/signin_images"
 
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
 
-            await asyncio.sleep(0.05)
+def delete_expired_signin_records(image_paths: list[str]):
+    """图片过了保留期被清理后，同时删除引用它们的签到记录，避免记录里的图片地址 404"""
+    db = next(get_db())
+    try:
+        deleted = crud.delete_signin_records_by_images(db, image_paths)
+    finally:
+        db.close()
+    if deleted:
+        print(f"[SigninImageStore] 删除了 {deleted} 条过期签到记录")
+
+
+signin_image_store = SigninImageStore(SIGNIN_IMAGES_PATH, on_expired=delete_expired_signin_records)
+# 内容哈希命名的新图片，以及旧版按时间戳命名的图片
+SIGNIN_IMAGE_NAME = re.compile(r"^([0-9a-f]{64}(_thumb)?|signin_\d+)\.jpg$")
+
+@router.get("/signin_records")
+async def list_signin_records(limit: int = Query(50, ge=1, le=500)):
+    """最近的签到记录，附缩略图地址"""
+    records = await run_db(crud.get_signin_records, limit)
+    return [{
+        "id": record.id,
+        "timestamp": record.timestamp,
+        "name": record.name,
+        "has_work_label": record.has_work_label,
+        "image_url": f"/monitor/signin_images/{record.image_path}",
+        "thumbnail_url": f"/monitor/signin_images/{signin_image_store.thumbnail_name(record.image_path)}",
+    } for record in records]
+
+@router.get("/signin_images/{name}")
+async def get_signin_image(name: str):
+    """签到图片/缩略图。文件名就是内容哈希，内容不会变，允许客户端长期缓存"""
+    if not SIGNIN_IMAGE_NAME.match(name):
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = signin_image_store.image_path(name)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path, media_type="image/jpeg",
+                        headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+@router.get("/traces")
+async def get_frame_traces(monitor: Optional[str] = None):
+    """
+    最近采样到的帧链路追踪，Chrome trace JSON 格式（chrome://tracing 或 Perfetto 打开）
+    monitor: 只导出某个监视终端（模糊匹配）
+    """
+    resolved_url = None
+    if monitor is not None:
+        resolved_url = monitor_registry.resolve(urllib.parse.unquote(monitor))
+        if resolved_url is None:
+            raise HTTPException(status_code=404, detail="Monitor not found")
+    return Response(json.dumps(tracer.export_chrome(resolved_url)), media_type="application/json",
+                    headers={"Content-Disposition": 'attachment; filename="frame_traces.json"'})
+
+@router.get("/push_stats")
+async def get_push_stats():
+    """WebSocket 推送统计：每个 monitor 每次推送的平均序列化耗时，以及各客户端收到的字节数"""
+    stats = {}
+    for video_url, clients in connected_clients.items():
+        state = push_states.get(video_url)
+        stats[video_url] = {
+            "avg_encode_us": round(state.encode_ns / state.encode_count / 1000, 1)
+                             if state and state.encode_count else None,
+            "clients": [{
+                "encoding": client.encoding,
+                "lang": client.lang,
+                "messages_sent": client.messages_sent,
+                "bytes_sent": client.bytes_sent,
+                "avg_bytes": round(client.bytes_sent / client.messages_sent, 1) if client.messages_sent else None,
+            } for client in clients],
+        }
+    return stats
+
+@router.get("/{blur_video_url}/video_feed")
+async def monitor_video_feed(
+    raw: bool = False,
+    width: Optional[int] = Query(None, ge=32, le=4096),
+    quality: Optional[int] = Query(None, ge=10, le=100),
+    fps: Optional[float] = Query(None, gt=0, le=30),
+    monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url)
+):
+    """
+    指定监视终端的视频流
+    raw=true 或 YOLO 已禁用时不画框（检测框从 /boxes 获取），不指定 width/quality 时直接透传摄像头原始 JPEG
+    width/quality: 缩放宽度和 JPEG 质量，同规格的客户端共享一次编码
+    fps: 最大帧率，客户端接收不过来时自动降低
+    """
+    resolved_url, monitor = monitor_info
+    raw = raw or not monitor.video_processor.enable_yolo_processing
+    return StreamingResponse(monitor.subscribe_video_feed(raw, width, quality, fps),
+                             media_type="multipart/x-mixed-replace; boundary=frame")
 
-    return StreamingResponse(generate(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+@router.get("/{blur_video_url}/boxes")
+async def monitor_boxes(monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url)):
+    """当前检测框（原始视频流模式下由前端绘制）"""
+    resolved_url, monitor = monitor_info
+    return monitor.output_boxes()
 
 
 @router.websocket("/{blur_video_url}/ws")
 async def websocket_monitor(websocket: WebSocket, blur_video_url: str):  # 这里不能 Depends
-    """指定监视终端的WebSocket连接"""
+    """
+    指定监视终端的WebSocket连接
+    握手参数: ?encoding=json|binary&lang=zh|en
+    binary 为嵌入式端的定长二进制状态帧（文字按消息 id 在本地渲染），见 backend/status_codec.py
+    """
     print(f"[/monitor/{blur_video_url}/ws] 收到新的 WebSocket 连接")
     resolved_url, monitor = decode_monitor_url(websocket, blur_video_url)
 
     if resolved_url not in connected_clients:
         connected_clients[resolved_url] = set()
 
+    client = None
     try:
         await websocket.accept()
-        connected_clients[resolved_url].add(websocket)
+        encoding = websocket.query_params.get("encoding", "json")
+        lang = websocket.query_params.get("lang", "zh")
+        client = WsClient(websocket,
+                          encoding=encoding if encoding in ENCODINGS else "json",
+                          lang=lang if lang in LANGUAGES else "zh",
+                          latency_histogram=metrics.histogram("push_latency_ms", monitor=resolved_url))
+        connected_clients[resolved_url].add(client)
 
         # 发送欢迎消息
-        await websocket.send_json({
+        client.offer(json.dumps({
             "type": "welcome",
             "message": f"WebSocket连接已建立 - 监视终端 {resolved_url}",
             "timestamp": time.time(),
             "camera_ip": resolved_url
-        })
+        }, ensure_ascii=False))
 
         while True:
             try:
@@ -117,58 +244,180 @@ async def websocket_monitor(websocket: WebSocket, blur_video_url: str):  # 这
                         monitor = monitor_registry.monitors.get(resolved_url)
                         if monitor:
                             monitor.refresh_generator_summary_health()
+                    elif action == "snapshot":
+                        # 客户端主动请求完整快照（如重连后）
+                        client.needs_snapshot = True
             except json.JSONDecodeError:
                 print(f"[/monitor/{resolved_url}/ws] 收到无效的JSON数据")
             except WebSocketDisconnect:
                 break
             except Exception as e:
                 print(f"[/monitor/{resolved_url}/ws] 错误: {str(e)}")
+                if client.closed:
+                    break
     except WebSocketDisconnect:
         pass
     except Exception as e:
         print(f"[/monitor/{resolved_url}/ws] 错误: {str(e)}")
     finally:
-        if websocket in connected_clients.get(resolved_url, set()):
-            connected_clients[resolved_url].remove(websocket)
+        if client:
+            client.close()
+            connected_clients.get(resolved_url, set()).discard(client)
+
+PUSH_CHECK_INTERVAL = 0.1  # 检测状态变化的间隔
+INSIGHTS_INTERVAL = 0.5  # insights 含秒级时长文字，最多每 0.5 秒重建一次
+HEARTBEAT_INTERVAL = 5  # 没有变化时的心跳间隔
+
+
+@dataclass
+class PushState:
+    """每个 monitor 的推送状态"""
+    status: dict = field(default_factory=dict)  # 最近一次的结构化状态 Monitor.output_status()
+    payloads: dict = field(default_factory=dict)  # lang -> 最近一次的 json 完整状态
+    snapshots: dict = field(default_factory=dict)  # (encoding, lang) -> 已序列化的完整快照，状态变化时清空
+    version: int = -1  # 最近一次的 DetectionStatus 快照版本
+    built_at: float = 0
+    sent_at: float = 0
+    # 序列化耗时统计
+    encode_ns: int = 0
+    encode_count: int = 0
+
+
+push_states: dict[str, PushState] = {}
+
+
+def build_status_payload(video_url: str, status: dict, lang: str = "zh") -> dict:
+    """合成推送给 json 客户端的完整状态（不含 timestamp）"""
+    return {
+        **render_insights(status, lang),
+        "camera_ip": video_url,
+        "is_active": status["is_active"],
+        "person_detected": status["is_person_detected"],
+        "cup_detected": status["is_cup_detected"],
+    }
+
 
 async def push_status_updates():
-    """定期向所有WebSocket客户端推送状态更新"""
+    """
+    向所有WebSocket客户端推送状态更新（变化驱动）
+    - DetectionStatus 快照版本变化时立即推送，其余字段最多每 0.5 秒检查一次
+    - json 客户端只收到变化的字段 (type=delta)，binary 客户端收到定长状态帧
+    - 没有变化时每 5 秒发一次心跳
+    - 新连接、请求快照或丢过消息的客户端会收到完整快照
+    每种 (编码, 语言) 每次只序列化一次，交给各客户端的有界队列，由各自的发送任务发出
+    """
     while True:
-        try:
-            # 推送各客户端状态
-            for video_url in list(connected_clients.keys()):
+        now = time.time()
+        for video_url, clients in list(connected_clients.items()):
+            if not clients:
+                continue
+            try:
                 if video_url not in monitor_registry.monitors:
                     raise Exception(f"Push {video_url} Monitor not found")
                 # 找到这个客户端对应的监视终端
                 monitor = monitor_registry.monitors[video_url]
-
-                # today_work_duration logic removed from here
-
-                current_insights = monitor.output_insights() # This now contains the formatted messages
-                status_payload = {
-                    **current_insights, # Spread the insights dictionary
-                    "timestamp": int(time.time()),
-                    "camera_ip": video_url,
-                    "is_active": monitor.video_processor.status.is_active,
-                    "person_detected": monitor.video_processor.status.is_person_detected,
-                    "cup_detected": monitor.video_processor.status.is_cup_detected,
-                }
-
-                clients_to_disconnect = set()
-                for client in connected_clients[video_url]:
-                    try:
-                        await client.send_json(status_payload) # Use new status_payload
-                    except Exception as e:
-                        clients_to_disconnect.add(client)
+                state = push_states.setdefault(video_url, PushState())
+
+                changed = summary_changed = False
+                deltas = {}
+                trace = None
+                version = monitor.video_processor.status.version
+                if version != state.version or now - state.built_at >= INSIGHTS_INTERVAL or not state.status:
+                    status = monitor.output_status()
+                    # 快照版本只用于判断是否要重建，内容没变就不推送
+                    changed = status != state.status
+                    summary_changed = status["summary"] != state.status.get("summary")
+                    if version != state.version:
+                        # 产生这个状态的那一帧如果被追踪了，继续记录推送阶段
+                        trace = monitor.video_processor.status_trace
+                        if trace is not None and trace.version != version:
+                            trace = None
+                    state.status, state.version, state.built_at = status, version, now
+                if changed:
+                    state.snapshots = {}
+                    # 只为正在使用的语言渲染，并算出各语言的增量
+                    old_payloads = state.payloads
+                    state.payloads = {lang: build_status_payload(video_url, state.status, lang)
+                                      for lang in {c.lang for c in clients if c.encoding == "json"}}
+                    for lang, payload in state.payloads.items():
+                        old_payload = old_payloads.get(lang, {})
+                        deltas[lang] = {k: v for k, v in payload.items() if old_payload.get(k) != v}
+            except Exception as e:
+                # 单个 monitor 出错不影响其他 monitor
+                print(f"[/ws push] 推送 {video_url} 状态更新时出错: {str(e)}")
+                continue
+
+            heartbeat = not changed and now - state.sent_at >= HEARTBEAT_INTERVAL
+            if changed or heartbeat:
+                state.sent_at = now
+            timestamp = int(now)
+
+            def encode_snapshot(encoding: str, lang: str):
+                # 状态没变时复用已序列化的快照
+                if (encoding, lang) not in state.snapshots:
+                    if encoding == "binary":
+                        message = encode_binary_status(state.status, timestamp, with_summary=True)
+                    else:
+                        if lang not in state.payloads:
+                            state.payloads[lang] = build_status_payload(video_url, state.status, lang)
+                        message = json.dumps({"type": "status", **state.payloads[lang], "timestamp": timestamp},
+                                             ensure_ascii=False)
+                    state.snapshots[(encoding, lang)] = message
+                return state.snapshots[(encoding, lang)]
+
+            def encode(encoding: str, lang: str, snapshot: bool):
+                if snapshot:
+                    return encode_snapshot(encoding, lang)
+                if encoding == "binary":
+                    if changed:
+                        return encode_binary_status(state.status, timestamp, with_summary=summary_changed)
+                    return encode_binary_heartbeat(timestamp) if heartbeat else None
+                if deltas.get(lang):
+                    return json.dumps({"type": "delta", **deltas[lang], "timestamp": timestamp},
+                                      ensure_ascii=False)
+                return json.dumps({"type": "heartbeat", "timestamp": timestamp}) if heartbeat else None
+
+            encode_start = time.perf_counter_ns()
+            encode_start_wall_ns = time.time_ns()
+            messages = {}
+            for client in list(clients):
+                key = (client.encoding, client.lang, client.needs_snapshot)
+                if key not in messages:
+                    messages[key] = encode(*key)
+                if messages[key] is None:
+                    continue
+                client.needs_snapshot = False
                 # 清理已断开的客户端
-                connected_clients[video_url].difference_update(
-                    clients_to_disconnect)
-        except Exception as e:
-            print(f"[/ws push] 推送状态更新时出错: {str(e)}")
-        await asyncio.sleep(0.5)
+                if not client.offer(messages[key], trace if changed else None):
+                    clients.discard(client)
+            # 全部为 None（没有变化也不是心跳）时什么都没编码，不计入耗时分布
+            if any(message is not None for message in messages.values()):
+                encode_ns = time.perf_counter_ns() - encode_start
+                state.encode_ns += encode_ns
+                state.encode_count += 1
+                metrics.histogram("push_encode_ms", monitor=video_url).observe(encode_ns / 1_000_000)
+                if trace is not None and changed:
+                    trace.add("push_encode", encode_start_wall_ns, encode_start_wall_ns + encode_ns)
+        await asyncio.sleep(PUSH_CHECK_INTERVAL)
 asyncio.create_task(push_status_updates())
 
 
+def collect_monitor_metrics() -> list:
+    """抓取 /metrics 时读取的现有统计：WebSocket 客户端数、UDP 组帧成功/失败数"""
+    samples = []
+    for video_url, monitor in list(monitor_registry.monitors.items()):
+        labels = {"monitor": video_url}
+        samples.append(("connected_clients", "gauge", labels, len(connected_clients.get(video_url, ()))))
+        udp_client = getattr(monitor.video_processor.camera, "udp_client", None)
+        if udp_client is not None:
+            samples.append(("udp_assembled_frames_total", "counter", labels, udp_client.assembled_frames))
+            samples.append(("udp_dropped_frames_total", "counter", labels, udp_client.dropped_frames))
+    # 同名指标要连续输出
+    samples.sort(key=lambda sample: sample[0])
+    return samples
+metrics.register_collector(collect_monitor_metrics)
+
+
 @router.get("/{blur_video_url}/toggle_yolo/{enable}")
 async def toggle_yolo(enable: bool, monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url)):
     """启用或禁用YOLO分析处理"""
@@ -176,25 +425,99 @@ async def toggle_yolo(enable: bool, monitor_info: tuple[str, Monitor] = Depends(
     monitor.video_processor.enable_yolo_processing = enable
     return {"status": "success", "message": f"YOLO处理已{'启用' if enable else '禁用'}"}
 
-@router.get("/{blur_video_url}/history") #, response_model=List[models.WorkingSession])
+@router.get("/{blur_video_url}/history")
 async def get_monitor_work_session_history(
     start_date_ts: int,
     end_date_ts: int,
-    db: Session = Depends(get_db),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = None,
     monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url) # Use existing dependency
 ):
+    """
+    分页获取工作会话，按开始时间升序
+    返回 {"sessions": [...], "next_cursor": ...}，把 next_cursor 作为 cursor 参数取下一页，为 null 时已取完
+    """
     resolved_url, monitor = monitor_info
     # resolved_url is the actual monitor_video_url needed for crud
+    # 查询在专用线程池里执行，不阻塞事件循环
+    return await get_history_page(resolved_url, start_date_ts, end_date_ts, limit, cursor)
 
-    sessions = crud.get_work_sessions_for_period(
-        db,
-        monitor_video_url=resolved_url,
-        start_date_ts=start_date_ts,
-        end_date_ts=end_date_ts
-    )
-    return sessions
+@router.get("/{blur_video_url}/history/export")
+async def export_monitor_work_session_history(
+    request: Request,
+    start_date_ts: int,
+    end_date_ts: int,
+    format: str = Query("ndjson", pattern="^(" + "|".join(EXPORT_FORMATS) + ")$"),
+    monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url)
+):
+    """流式导出工作会话（ndjson / csv / parquet），逐页查询逐页发送，内存占用与时间范围无关"""
+    resolved_url, monitor = monitor_info
+    if format == "parquet" and pq is None:
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+    gzip_enabled = format != "parquet" and "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Disposition": f'attachment; filename="history_{start_date_ts}_{end_date_ts}.{format}"'}
+    if gzip_enabled:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_history_export(resolved_url, start_date_ts, end_date_ts, format, gzip_enabled),
+        media_type=MEDIA_TYPES[format], headers=headers)
+
+@router.get("/{blur_video_url}/health_metrics")
+async def get_monitor_health_metrics(
+    days: int = Query(7, ge=1, le=366),
+    monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url)
+):
+    """
+    最近 days 天（含今天）每天的在岗汇总，读每日汇总表，O(天数)
+    今天进行中的会话还没进汇总表，按当前时间补上
+    """
+    resolved_url, monitor = monitor_info
+    today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    day_starts = [int((today - datetime.timedelta(days=i)).timestamp()) for i in range(days - 1, -1, -1)]
+    stats = {row.day_start: {
+        "day_start": row.day_start,
+        "total_seconds": row.total_seconds,
+        "session_count": row.session_count,
+        "first_presence": row.first_presence,
+        "last_presence": row.last_presence,
+        "longest_seconds": row.longest_seconds,
+    } for row in await run_db(crud.get_daily_stats, resolved_url, day_starts[0], day_starts[-1])}
+
+    session = monitor.health_analyze.current_working_session
+    if session is not None:
+        for day_start, seg_start, seg_end in crud.split_by_day(session.start_time, int(time.time())):
+            if day_start < day_starts[0]:
+                continue
+            seconds = seg_end - seg_start
+            day = stats.get(day_start)
+            if day is None:
+                stats[day_start] = {"day_start": day_start, "total_seconds": seconds, "session_count": 1,
+                                    "first_presence": seg_start, "last_presence": seg_end,
+                                    "longest_seconds": seconds}
+            else:
+                day["total_seconds"] += seconds
+                day["session_count"] += 1
+                day["last_presence"] = seg_end
+                day["longest_seconds"] = max(day["longest_seconds"], seconds)
+
+    empty = {"total_seconds": 0, "session_count": 0, "first_presence": None,
+             "last_presence": None, "longest_seconds": 0}
+    return [stats.get(day_start) or {"day_start": day_start, **empty} for day_start in day_starts]
+
+@router.get("/{blur_video_url}/series")
+async def get_monitor_status_series(
+    start_ts: int,
+    end_ts: int,
+    resolution: Optional[str] = Query(None, pattern="^(" + "|".join(RESOLUTIONS) + ")$"),
+    monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url)
+):
+    """
+    每秒检测状态的时序（人/活跃/水杯秒数 + 平均功率），不指定 resolution 时按跨度自动选择
+    例：久坐时长 = person_seconds - active_seconds
+    """
+    resolved_url, monitor = monitor_info
+    return await run_db(get_status_series, resolved_url, start_ts, end_ts, resolution)
 
-SIGNIN_IMAGES_PATH = "backend/signin_images"
 @router.post("/{blur_video_url}/face_signin")
 async def do_face_signin(
     user_id: Optional[int] = None,
@@ -202,19 +525,20 @@ async def do_face_signin(
 ):
     resolved_url, monitor = monitor_info
 
-    monitor.video_processor.enable_face_processing = True  # 启用人脸处理模式
-
-    # 保存签到图片
-    os.makedirs(SIGNIN_IMAGES_PATH, exist_ok=True)
+    # 人脸处理只由人脸视频流是否有人观看决定（见 Monitor._set_face_processing），
+    # 签到页面打开着人脸视频流，这里直接读它最近一次的识别结果，不去改开关
+    # 保存签到图片：优先用摄像头原始 JPEG，写文件和缩略图在线程里完成
     timestamp = int(time.time())
-    image_path = os.path.join(SIGNIN_IMAGES_PATH, f"signin_{timestamp}.jpg")
-    annotated_frame = monitor.video_processor.get_latest_frame()
-    cv2.imwrite(image_path, annotated_frame)
+    image_name = await signin_image_store.save_async(
+        monitor.video_processor.get_latest_jpeg(), monitor.video_processor.get_latest_frame)
 
     # 获取识别结果
     recognition_result = monitor.video_processor.face_signin.result
 
-    monitor.video_processor.enable_face_processing = False  # 禁用人脸处理模式
+    if image_name is not None:
+        await run_db(crud.create_signin_record, name=recognition_result.recognized_who,
+                     has_work_label=recognition_result.has_work_label,
+                     image_path=image_name, timestamp=timestamp)
 
     return {
         "status": "success",
@@ -225,26 +549,7 @@ async def do_face_signin(
 
 @router.get("/{blur_video_url}/video_feed_with_faces")
 async def monitor_video_feed_with_recognition(monitor_info: tuple[str, Monitor] = Depends(decode_monitor_url)):
-    """带人脸识别的视频流"""
+    """带人脸识别的视频流（有人观看时自动启用人脸处理）"""
     resolved_url, monitor = monitor_info
-    monitor.video_processor.enable_face_processing = True
-
-    async def generate():
-        try:
-            while True:
-                if monitor.video_processor.face_signin is not None:
-                    frame = monitor.video_processor.face_signin.result.draw_boxes_on(
-                        monitor.video_processor.get_latest_frame())
-                else:
-                    frame = monitor.video_processor.get_latest_frame()
-                if frame is not None:
-                    _, jpeg = cv2.imencode('.jpg', frame)
-                    frame_bytes = jpeg.tobytes()
-                    yield (b'--frame\r\n'
-                        b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                await asyncio.sleep(0.05)
-        finally:
-            # 可能是连接断开，那就禁用人脸处理
-            monitor.video_processor.enable_face_processing = False
-
-    return StreamingResponse(generate(), media_type="multipart/x-mixed-replace; boundary=frame")
+    return StreamingResponse(monitor.video_feed_with_faces.subscribe(),
+                             media_type="multipart/x-mixed-replace; boundary=frame")
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from fastapi import WebSocket
+
+from backend.metrics import Histogram
+
+
+class WsClient:
+    """
+    一个 WebSocket 客户端：有界发送队列 + 独立发送任务
+    推送循环只负责非阻塞入队，慢客户端不会拖慢其他客户端
+    """
+    QUEUE_SIZE = 4
+    # 连续这么多次入队时队列都是满的（推送间隔 0.5s，约 10 秒），认为连接已半死，断开
+    MAX_FULL_COUNT = 20
+
+    def __init__(self, websocket: WebSocket, encoding: str = "json", lang: str = "zh",
+                 latency_histogram: Histogram | None = None):
+        self.websocket = websocket
+        # 握手时协商的编码和语言，见 backend/status_codec.py
+        self.encoding = encoding
+        self.lang = lang
+        self.bytes_sent = 0
+        self.messages_sent = 0
+        # 入队到发送完成的耗时（毫秒）
+        self.latency_histogram = latency_histogram
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.full_count = 0
+        self.closed = False
+        # 推送的是增量，新连接或丢过消息后需要先补发一次完整快照
+        self.needs_snapshot = True
+        self.sender_task = asyncio.create_task(self._send_loop())
+
+    def offer(self, message: str | bytes, trace=None) -> bool:
+        """
+        非阻塞入队。队列满时丢弃最旧的一条（状态消息只关心最新的）
+        trace: 产生这条状态的帧的链路追踪（可选），发送完成后记录 ws_send 阶段
+        返回: 客户端是否仍然可用
+        """
+        if self.closed:
+            return False
+        if self.queue.full():
+            self.queue.get_nowait()
+            # 丢掉的可能是增量，之后要补发完整快照
+            self.needs_snapshot = True
+            self.full_count += 1
+            if self.full_count >= self.MAX_FULL_COUNT:
+                print("[WsClient] 客户端长时间无法接收，断开连接")
+                self.close()
+                asyncio.create_task(self._close_socket())
+                return False
+        else:
+            self.full_count = 0
+        self.queue.put_nowait((message, time.perf_counter(), trace, time.time_ns() if trace else 0))
+        return True
+
+    async def _send_loop(self):
+        try:
+            while True:
+                message, enqueued_at, trace, enqueued_ns = await self.queue.get()
+                if isinstance(message, bytes):
+                    await self.websocket.send_bytes(message)
+                    self.bytes_sent += len(message)
+                else:
+                    await self.websocket.send_text(message)
+                    self.bytes_sent += len(message.encode('utf-8'))
+                self.messages_sent += 1
+                if self.latency_histogram is not None:
+                    self.latency_histogram.observe((time.perf_counter() - enqueued_at) * 1000)
+                if trace is not None:
+                    trace.add("ws_send", enqueued_ns, encoding=self.encoding)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[WsClient] 发送失败: {e}")
+        finally:
+            self.closed = True
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """停止发送任务（不负责关闭底层连接的接收端）"""
+        self.closed = True
+        self.sender_task.cancel()
@@ -17,9 +17,19 @@ class BaseCameraCapture(ABC):
         # (height, width, 3), BGR格式
         self.latest_frame: np.ndarray | None = None
         self.latest_frame_time_ms: int | None = None
+        # 摄像头原始 JPEG 字节（如果传输方式本身就是 JPEG）
+        self.latest_jpeg: bytes | None = None
+        # 可选的录制器，见 recorder.CameraRecorder
+        self.recorder = None
         self.is_running = False
         self.connected = False
         self.frame_lock = threading.Lock()
+        # 性能指标直方图，由 attach_metrics 设置
+        self.capture_interval_histogram = None
+        self.decode_histogram = None
+        self.monitor_label = "-"
+        # 最新帧的采集时间戳 (帧号, 阶段列表)，处理线程采样到这一帧时补进链路追踪，见 backend/tracing.py
+        self.latest_capture_timing = None
 
     @abstractmethod
     def start(self, video_url: str):
@@ -38,15 +48,46 @@ class BaseCameraCapture(ABC):
                 return self.latest_frame.copy(), self.latest_frame_time_ms
             return None, None
 
+    def get_latest_frame_with_timing(self):
+        """获取最新帧、时间戳和它的采集时间戳（线程安全）"""
+        with self.frame_lock:
+            if self.latest_frame is not None:
+                return self.latest_frame.copy(), self.latest_frame_time_ms, self.latest_capture_timing
+            return None, None, None
+
+    def get_latest_jpeg(self) -> tuple[bytes | None, int | None]:
+        """获取最新帧的摄像头原始 JPEG 字节（不解码、不拷贝），没有则为 None"""
+        with self.frame_lock:
+            return self.latest_jpeg, self.latest_frame_time_ms
+
     def is_connected(self):
         """检查是否连接"""
         return self.is_running and self.connected
 
-    def _update_frame(self, frame):
-        """更新最新帧（内部方法，线程安全）"""
+    def attach_metrics(self, monitor: str):
+        """记录帧间隔（即采集帧率）和 JPEG 解码耗时，见 backend/metrics.py"""
+        from backend.metrics import metrics
+        self.monitor_label = monitor
+        self.capture_interval_histogram = metrics.histogram("capture_interval_ms", monitor=monitor)
+        self.decode_histogram = metrics.histogram("decode_ms", monitor=monitor)
+
+    def _update_frame(self, frame, jpeg: bytes | None = None, decode_ms: float | None = None,
+                      capture_timing: tuple | None = None):
+        """更新最新帧（内部方法，线程安全），capture_timing 为 (帧号, 采集各阶段的时间戳)"""
         with self.frame_lock:
+            self.latest_capture_timing = capture_timing
+            previous_time_ms = self.latest_frame_time_ms
+            # 锁外只用局部变量，其他采集回调可能已经更新了 latest_frame_time_ms
+            frame_time_ms = int(time.time_ns() / 1_000_000)
             self.latest_frame = frame
-            self.latest_frame_time_ms = int(time.time_ns() / 1_000_000)
+            self.latest_jpeg = jpeg
+            self.latest_frame_time_ms = frame_time_ms
+        if self.capture_interval_histogram is not None and previous_time_ms is not None:
+            self.capture_interval_histogram.observe(frame_time_ms - previous_time_ms)
+        if self.decode_histogram is not None and decode_ms is not None:
+            self.decode_histogram.observe(decode_ms)
+        if self.recorder is not None:
+            self.recorder.write(frame, jpeg, frame_time_ms)
 
     def _register_camera_by_ip(self, ip: str):
         """注册新发现的摄像头IP（由子类调用）"""
@@ -57,6 +98,7 @@ class BaseCameraCapture(ABC):
 from .websocket import WebSocketCameraCapture
 from .udpserver import UdpCameraCapture
 from .cv2cam import CV2CameraCapture
+from .replay import ReplayCameraCapture
 # fmt: on
 
 
@@ -66,5 +108,7 @@ def create_camera_capture(video_url: str) -> BaseCameraCapture:
         return WebSocketCameraCapture()
     elif video_url.startswith("udpserver://"):
         return UdpCameraCapture()
+    elif video_url.startswith("replay://"):
+        return ReplayCameraCapture()
     else:
         return CV2CameraCapture()
@@ -0,0 +1,91 @@
+import os
+import struct
+import threading
+
+import cv2
+
+# 段文件：连续的记录，每条记录 = 头(时间戳ms u64, 长度 u32) + JPEG 原始字节
+RECORD_HEADER = struct.Struct("<QI")
+# 索引文件（段文件路径 + ".idx"）：每条 = (时间戳ms u64, 偏移 u64, 长度 u32)
+INDEX_ENTRY = struct.Struct("<QQI")
+
+
+class CameraRecorder:
+    """把任意 BaseCameraCapture 的 JPEG 流录制为带索引的段文件，供 replay:// 回放"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.data_file = open(path, "wb")
+        self.index_file = open(path + ".idx", "wb")
+        self.lock = threading.Lock()
+        self.frame_count = 0
+
+    def write(self, frame, jpeg: bytes | None, time_ms: int):
+        """写入一帧。没有原始 JPEG 的摄像头（如 CV2）才重新编码"""
+        if jpeg is None:
+            ok, buf = cv2.imencode('.jpg', frame)
+            if not ok:
+                return
+            jpeg = buf.tobytes()
+        with self.lock:
+            if self.data_file.closed:
+                return
+            offset = self.data_file.tell()
+            self.data_file.write(RECORD_HEADER.pack(time_ms, len(jpeg)))
+            self.data_file.write(jpeg)
+            self.index_file.write(INDEX_ENTRY.pack(
+                time_ms, offset + RECORD_HEADER.size, len(jpeg)))
+            self.frame_count += 1
+
+    def close(self):
+        with self.lock:
+            self.data_file.close()
+            self.index_file.close()
+
+
+def read_index(path: str) -> list[tuple[int, int, int]]:
+    """读取索引 [(时间戳ms, 偏移, 长度)]，索引文件缺失时扫描段文件重建"""
+    entries = []
+    if os.path.exists(path + ".idx"):
+        with open(path + ".idx", "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        return list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            time_ms, length = RECORD_HEADER.unpack(header)
+            entries.append((time_ms, f.tell(), length))
+            f.seek(length, os.SEEK_CUR)
+    return entries
+
+
+if __name__ == "__main__":
+    # 用法: python -m backend.camera_capture.recorder <video_url> <输出路径> [秒数]
+    import sys
+    import time
+    from backend.camera_capture import create_camera_capture
+
+    if len(sys.argv) < 3:
+        print("用法: python -m backend.camera_capture.recorder <video_url> <输出路径> [秒数]")
+        sys.exit(1)
+    video_url, out_path = sys.argv[1], sys.argv[2]
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else float("inf")
+
+    camera = create_camera_capture(video_url)
+    camera.recorder = CameraRecorder(out_path)
+    camera.start(video_url)
+    print(f"[Recorder] 正在录制 {video_url} -> {out_path}")
+    start = time.time()
+    try:
+        while time.time() - start < seconds:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    camera.recorder.close()
+    print(f"[Recorder] 录制结束，共 {camera.recorder.frame_count} 帧")
+    os._exit(0)
@@ -0,0 +1,73 @@
+from . import BaseCameraCapture
+from .recorder import read_index
+
+import urllib.parse
+import cv2, time, threading
+import numpy as np
+
+
+class ReplayCameraCapture(BaseCameraCapture):
+    """
+    回放 CameraRecorder 录制的段文件，用于可重复的性能测试
+    url 格式 replay://path/to/file.mjrec?speed=1&loop=1
+    speed=1 实时，speed=N N倍速，speed=0 尽可能快
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.path = None
+        self.speed = 1.0
+        self.loop = True
+        self.thread = None
+        self.played_frames = 0
+
+    def _replay_loop(self):
+        entries = read_index(self.path)
+        if not entries:
+            print(f"[ReplayCamera] 录制文件为空: {self.path}")
+            return
+        self.connected = True
+        with open(self.path, "rb") as f:
+            while self.is_running:
+                start_wall = time.monotonic()
+                start_ts = entries[0][0]
+                for time_ms, offset, length in entries:
+                    if not self.is_running:
+                        break
+                    if self.speed > 0:
+                        # 按录制时间戳换算到当前倍速的墙钟时间
+                        delay = (time_ms - start_ts) / 1000 / self.speed \
+                            - (time.monotonic() - start_wall)
+                        if delay > 0:
+                            time.sleep(delay)
+                    f.seek(offset)
+                    jpeg = f.read(length)
+                    frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                    if frame is not None:
+                        self._update_frame(frame, jpeg)
+                        self.played_frames += 1
+                if not self.loop:
+                    break
+        self.connected = False
+        print(f"[ReplayCamera] 回放结束，共 {self.played_frames} 帧")
+
+    def start(self, video_url):
+        """启动回放"""
+        if not video_url.startswith("replay://"):
+            raise ValueError("[ReplayCamera] video_url 必须以'replay://'开头")
+        path, _, query = video_url[len("replay://"):].partition("?")
+        params = urllib.parse.parse_qs(query)
+        self.path = urllib.parse.unquote(path)
+        self.speed = float(params.get("speed", ["1"])[0])
+        self.loop = params.get("loop", ["1"])[0] != "0"
+        if not self.is_running:
+            self.is_running = True
+            self.thread = threading.Thread(target=self._replay_loop, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """停止回放"""
+        self.is_running = False
+        self.connected = False
+        if self.thread:
+            self.thread.join(timeout=5)
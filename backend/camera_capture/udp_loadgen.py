@@ -0,0 +1,159 @@
+"""
+模拟多个 ESP32 UDP 摄像头的压测工具，使用与固件相同的分片协议：
+包头 8 字节 (frame_index u32, chunk_index u16, chunk_total u16，小端) + 最多 1464 字节 JPEG 分片
+
+每个模拟摄像头绑定不同的源地址（默认 127.0.0.2, 127.0.0.3 ...），
+因为服务端按源 IP 区分摄像头，仅靠源端口无法区分。
+
+用法:
+    python -m backend.camera_capture.udp_loadgen --cameras 8 --fps 10 --jpeg path/to/jpegs/ \\
+        --loss 0.01 --reorder 0.05 --dup 0.01 --seconds 30
+
+默认会在本进程内为每个模拟摄像头启动 UdpCameraCapture，结束时报告每个摄像头服务端实际组好的帧数；
+加 --no-server 则只发包，目标为已运行的服务端。
+"""
+import argparse
+import ipaddress
+import os
+import random
+import socket
+import struct
+import threading
+import time
+
+CHUNK_PAYLOAD_SIZE = 1464
+CHUNK_HEADER = struct.Struct("<IHH")
+
+
+def load_jpegs(paths: list[str]) -> list[bytes]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path))
+                      if name.lower().endswith((".jpg", ".jpeg"))]
+        else:
+            files.append(path)
+    jpegs = []
+    for file in files:
+        with open(file, "rb") as f:
+            jpegs.append(f.read())
+    if not jpegs:
+        raise ValueError("[UdpLoadgen] 没有找到 JPEG 文件")
+    return jpegs
+
+
+def make_packets(frame_index: int, jpeg: bytes) -> list[bytes]:
+    """按固件协议把一帧 JPEG 切成 UDP 包"""
+    chunks = [jpeg[i:i + CHUNK_PAYLOAD_SIZE] for i in range(0, len(jpeg), CHUNK_PAYLOAD_SIZE)]
+    return [CHUNK_HEADER.pack(frame_index, i, len(chunks)) + chunk for i, chunk in enumerate(chunks)]
+
+
+def impair(packets: list[bytes], loss: float, reorder: float, dup: float) -> list[bytes]:
+    """模拟丢包、乱序、重复"""
+    out = []
+    for packet in packets:
+        if random.random() < loss:
+            continue
+        out.append(packet)
+        if random.random() < dup:
+            out.append(packet)
+    for i in range(len(out) - 1):
+        if random.random() < reorder:
+            out[i], out[i + 1] = out[i + 1], out[i]
+    return out
+
+
+class FakeCamera:
+    """一个模拟摄像头：独立源地址、独立发送线程"""
+
+    def __init__(self, src_ip: str, target: tuple[str, int], jpegs: list[bytes], args):
+        self.src_ip = src_ip
+        self.target = target
+        self.jpegs = jpegs
+        self.args = args
+        self.sent_frames = 0
+        self.sent_packets = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((src_ip, 0))
+
+    def run(self, stop_at: float):
+        interval = 1.0 / self.args.fps
+        next_time = time.monotonic()
+        frame_index = 0
+        while time.monotonic() < stop_at:
+            jpeg = self.jpegs[frame_index % len(self.jpegs)]
+            packets = impair(make_packets(frame_index, jpeg),
+                             self.args.loss, self.args.reorder, self.args.dup)
+            for packet in packets:
+                self.sock.sendto(packet, self.target)
+            self.sent_frames += 1
+            self.sent_packets += len(packets)
+            frame_index += 1
+
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESP32 UDP 摄像头压测工具")
+    parser.add_argument("--jpeg", nargs="+", required=True, help="JPEG 文件或目录")
+    parser.add_argument("--cameras", type=int, default=4, help="模拟摄像头数量")
+    parser.add_argument("--fps", type=float, default=10, help="每个摄像头的帧率")
+    parser.add_argument("--seconds", type=float, default=10, help="压测时长")
+    parser.add_argument("--target", default="127.0.0.1:8099", help="UDP 图传服务器地址")
+    parser.add_argument("--src-base", default="127.0.0.2", help="第一个模拟摄像头的源地址，后续依次递增")
+    parser.add_argument("--loss", type=float, default=0.0, help="丢包率")
+    parser.add_argument("--reorder", type=float, default=0.0, help="相邻包交换概率")
+    parser.add_argument("--dup", type=float, default=0.0, help="重复包概率")
+    parser.add_argument("--no-server", action="store_true", help="不在本进程内启动接收端")
+    args = parser.parse_args()
+
+    host, port = args.target.split(":")
+    target = (host, int(port))
+    jpegs = load_jpegs(args.jpeg)
+    src_base = ipaddress.ip_address(args.src_base)
+    src_ips = [str(src_base + i) for i in range(args.cameras)]
+
+    captures = {}
+    if not args.no_server:
+        from backend.camera_capture import UdpCameraCapture
+        for src_ip in src_ips:
+            capture = UdpCameraCapture()
+            capture.start(f"udpserver://{host}:{port}/{src_ip}")
+            captures[src_ip] = capture
+        time.sleep(0.5)  # 等待监听线程绑定端口
+
+    cameras = [FakeCamera(src_ip, target, jpegs, args) for src_ip in src_ips]
+    stop_at = time.monotonic() + args.seconds
+    threads = [threading.Thread(target=camera.run, args=(stop_at,), daemon=True) for camera in cameras]
+    print(f"[UdpLoadgen] {args.cameras} 个摄像头 x {args.fps}fps -> {args.target}，持续 {args.seconds}s")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    time.sleep(0.5)  # 等待接收端处理完剩余的包
+
+    print(f"{'摄像头':<16}{'发送帧':>8}{'发送包':>10}{'组帧':>8}{'丢弃':>8}{'组帧率':>8}{'fps':>8}")
+    total_sent = total_assembled = 0
+    for camera in cameras:
+        line = f"{camera.src_ip:<16}{camera.sent_frames:>8}{camera.sent_packets:>10}"
+        if camera.src_ip in captures:
+            server_info = UdpCameraCapture._udp_servers[(host, int(port))]
+            client = server_info['udp_camera_clients'][camera.src_ip]
+            ratio = client.assembled_frames / camera.sent_frames if camera.sent_frames else 0
+            line += (f"{client.assembled_frames:>8}{client.dropped_frames:>8}"
+                     f"{ratio:>8.1%}{client.assembled_frames / args.seconds:>8.1f}")
+            total_assembled += client.assembled_frames
+        total_sent += camera.sent_frames
+        print(line)
+    if captures:
+        print(f"[UdpLoadgen] 合计: 发送 {total_sent} 帧，服务端组帧 {total_assembled} 帧 "
+              f"({total_assembled / args.seconds:.1f} fps)")
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from ast import Dict
-from collections import defaultdict
+from collections import defaultdict, deque
 from turtle import update
 from . import BaseCameraCapture
 
@@ -10,6 +10,7 @@ import threading
 import asyncio
 import numpy as np
 
+
 class UdpCameraCapture(BaseCameraCapture):
     """
     作为 UDP Server 管理每个 UDP 摄像头客户端（每个客户端都是独立实例）
@@ -23,6 +24,7 @@ class UdpCameraCapture(BaseCameraCapture):
         self.udp_ip: str = None
         self.udp_port: int = None
         self.camera_ip: str = None
+        self.udp_client: "UdpCameraClient | None" = None
 
     def start(self, video_url):
         # 添加新的摄像头捕获实例
@@ -54,6 +56,8 @@ class UdpCameraCapture(BaseCameraCapture):
         server_info = self._udp_servers[server_key]
         if self.camera_ip not in server_info['udp_camera_clients']:
             server_info['udp_camera_clients'][self.camera_ip] = UdpCameraClient(update_frame_callback=self._update_frame)
+        # 组帧统计（assembled_frames / dropped_frames）从这里读取
+        self.udp_client = server_info['udp_camera_clients'][self.camera_ip]
         # 启动UDP服务器（如果还没启动）
         if not server_info['is_running']:
             server_info['is_running'] = True
@@ -119,6 +123,12 @@ class UdpCameraClient():
         self.update_frame_callback = update_frame_callback
         self.frame_buffer = defaultdict(dict)  # frame_id -> {chunk_id: bytes}
         self.frame_chunk_count = {}            # frame_id -> chunk_total
+        self.frame_first_packet_ns = {}        # frame_id -> 第一个分片到达时间，用于链路追踪
+        # 统计：成功组帧数、丢弃（分片缺失/解码失败）帧数
+        self.assembled_frames = 0
+        self.dropped_frames = 0
+        # 最近已组好的帧，用于忽略迟到的重复分片
+        self.completed_frames = deque(maxlen=8)
 
     def process(self, data):
         if len(data) < 8:
@@ -129,7 +139,11 @@ class UdpCameraClient():
         chunk_index = int.from_bytes(data[4:6], 'little')
         chunk_total = int.from_bytes(data[6:8], 'little')
         chunk_payload = data[8:]
+        if frame_index in self.completed_frames:
+            return  # 重复分片
 
+        if frame_index not in self.frame_buffer:
+            self.frame_first_packet_ns[frame_index] = time.time_ns()
         # 存入缓存（可能乱序，所以直接放进 dict）
         self.frame_buffer[frame_index][chunk_index] = chunk_payload
         self.frame_chunk_count[frame_index] = chunk_total
@@ -138,6 +152,8 @@ class UdpCameraClient():
 
         # 如果收齐了，立即组帧
         if chunk_total - len(self.frame_buffer[frame_index]) <= 0:
+            last_packet_ns = time.time_ns()
+            first_packet_ns = self.frame_first_packet_ns.pop(frame_index, last_packet_ns)
             try:
                 chunks = [self.frame_buffer[frame_index][i]
                             for i in range(chunk_total)]
@@ -145,20 +161,34 @@ class UdpCameraClient():
                 # 有分片丢失，跳过
                 del self.frame_buffer[frame_index]
                 del self.frame_chunk_count[frame_index]
+                self.dropped_frames += 1
                 return
 
             latest_frame = b"".join(chunks)
             # 解码JPEG为OpenCV帧
+            decode_start_ns = time.time_ns()
+            decode_start = time.perf_counter()
             nparr = np.frombuffer(latest_frame, np.uint8)
             frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             if frame is not None:
-                self.update_frame_callback(frame)
+                # 只记录时间戳，是否追踪这一帧由处理线程取帧时决定
+                decode_end_ns = time.time_ns()
+                capture_timing = (frame_index, (
+                    ("network", first_packet_ns, last_packet_ns, {"chunks": chunk_total}),
+                    ("reassembly", last_packet_ns, decode_start_ns, {"bytes": len(latest_frame)}),
+                    ("decode", decode_start_ns, decode_end_ns, {}),
+                ))
+                self.update_frame_callback(frame, latest_frame, (time.perf_counter() - decode_start) * 1000,
+                                           capture_timing)
+                self.assembled_frames += 1
             else:
                 print("[UdpCamera] JPEG解码失败")
+                self.dropped_frames += 1
             
             # 清理对应缓存
             del self.frame_buffer[frame_index]
             del self.frame_chunk_count[frame_index]
+            self.completed_frames.append(frame_index)
 
     def cleanup_buffer(self):
         """清理 buffer - 只删除超时或不可能完成的帧"""
@@ -179,3 +209,5 @@ class UdpCameraClient():
         for frame_id in frames_to_remove:
             self.frame_buffer.pop(frame_id, None)
             self.frame_chunk_count.pop(frame_id, None)
+            self.frame_first_packet_ns.pop(frame_id, None)
+            self.dropped_frames += 1
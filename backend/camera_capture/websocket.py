@@ -1,9 +1,10 @@
 from . import BaseCameraCapture
 
-import websockets, threading, asyncio, cv2
+import websockets, threading, asyncio, cv2, time
 import numpy as np
 
 
+
 class WebSocketCameraCapture(BaseCameraCapture):
     """
     WebSocket 视频客户端，从ESP32-CAM通过WebSocket接收JPEG数据
@@ -29,9 +30,15 @@ class WebSocketCameraCapture(BaseCameraCapture):
                             break
 
                         if isinstance(message, bytes):
+                            decode_start_ns = time.time_ns()
+                            decode_start = time.perf_counter()
                             frame = self._parse_frame(message)
                             if frame is not None:
-                                self._update_frame(frame)
+                                # WebSocket 没有分片信息，只记录解码阶段
+                                capture_timing = (None, (("decode", decode_start_ns, time.time_ns(),
+                                                          {"bytes": len(message)}),))
+                                self._update_frame(frame, message, (time.perf_counter() - decode_start) * 1000,
+                                                   capture_timing)
                                 print("[WebSocketCamera] 接收到新帧")
                         else:
                             print("[WebSocketCamera] 接收到非字节消息")
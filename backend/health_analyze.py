@@ -1,11 +1,13 @@
-import time
 import threading
+import time
 from datetime import datetime # timedelta removed
 # from charset_normalizer import detect # This import seems unused
 # from sqlalchemy.orm import Session # Session type hint no longer needed
 from backend.video_processor import VideoProcessor
-from database import crud, get_db
-import traceback
+from backend.work_duration import WorkDurationAccumulator
+from backend.analytics import HealthAnalytics
+from backend.health_scheduler import health_scheduler
+from database import session_writer, status_series
 
 
 class HealthAnalyze:
@@ -13,68 +15,77 @@ class HealthAnalyze:
 
     # ACTIVITY_CHECK_INTERVAL, WATER_CHECK_INTERVAL, HEALTH_METRICS_INTERVAL removed
 
-    def __init__(self, video_processor: VideoProcessor): # monitor_video_url parameter removed
-        """初始化健康分析服务"""
+    def __init__(self, video_processor: VideoProcessor, current_processor=None): # monitor_video_url parameter removed
+        """初始化健康分析服务（current_processor 可选，用于记录功率时序）"""
         self.video_processor = video_processor
-        self.detection_status = self.video_processor.status
+        self.current_processor = current_processor
         self.monitor_video_url = self.video_processor.video_url # Set from video_processor
 
         self.is_running = False
-        self.analyze_thread = None
+        # 调度线程的回调与 stop() 互斥，stop 之后的回调直接返回
+        self.lock = threading.Lock()
 
         # last_activity_check, last_water_check, last_health_metrics removed
         # inactive_start_time removed
 
-        # 当前工作会话ID
-        self.current_working_session_id = None
+        # 当前工作会话（由写线程批量落库）
+        self.current_working_session = None
+        # 今日在岗时长（内存累加，供推送循环读取）
+        self.work_duration = WorkDurationAccumulator(self.monitor_video_url)
+        # 久坐、喝水、活动比例、通电时长的增量分析（每秒 O(1) 更新）
+        self.analytics = HealthAnalytics()
 
     def start(self):
         """启动健康分析服务"""
         if not self.is_running:
             self.is_running = True
-            # 启动分析线程
-            self.analyze_thread = threading.Thread(target=self._analyze_loop)
-            self.analyze_thread.daemon = True
-            self.analyze_thread.start()
+            # 由共用的调度线程每秒调用 tick，有人/无人变化时立即调用 on_status_change
+            self.video_processor.on_person_change = lambda: health_scheduler.notify(self)
+            health_scheduler.add(self)
 
             print("[Bootstrap] 健康分析服务已启动")
 
     def stop(self):
         """停止健康分析服务"""
-        self.is_running = False
-        # 等待分析线程结束
-        if self.analyze_thread:
-            self.analyze_thread.join()
-
-        # 结束当前工作会话
-        if self.current_working_session_id:
-            db = next(get_db())
-            try:
-                crud.end_working_session(db, self.current_working_session_id)
-                self.current_working_session_id = None
-            finally:
-                db.close()
+        self.video_processor.on_person_change = None
+        health_scheduler.remove(self)
+        with self.lock:
+            self.is_running = False
+            # 结束当前工作会话，并等写线程落库
+            if self.current_working_session:
+                self._end_working_session()
+        status_series.flush(self.monitor_video_url)
+        session_writer.flush()
 
         print("健康分析服务已停止")
 
-    def _analyze_loop(self):
-        """分析主循环"""
-        while self.is_running:
-            try:
-                # current_time = datetime.now() # Removed as no longer directly used for interval checks
-
-                # 更新工作状态
-                self.process_working_session(
-                    self.detection_status.is_person_detected)
-
-                # Interval checks for activity, water, and health metrics removed
-
-            except Exception as e:
-                print(f"分析过程中出错: {e}")
-                traceback.print_exc()
-
-            # 每秒检查一次
-            time.sleep(1)
+    def tick(self):
+        """每秒一次（由 HealthScheduler 调用，不能阻塞）"""
+        with self.lock:
+            if self.is_running:
+                self._tick()
+
+    def _tick(self):
+        # 更新工作状态
+        # status 是不可变快照，每次都要重新取
+        status = self.video_processor.status
+        # 兜底：变化通知之外再按当前快照检查一次，保证会话状态和快照一致
+        self.process_working_session(status.is_person_detected)
+        now = int(time.time())
+        power = self.current_processor.power if self.current_processor else None
+        # 记录每秒状态时序
+        status_series.append(
+            self.monitor_video_url, now,
+            status.is_person_detected, status.is_active, status.is_cup_detected, power)
+        self.analytics.update(now, status.is_person_detected, status.is_active, status.is_cup_detected, power)
+        # 跨天或定期与数据库对账
+        self.work_duration.maybe_reconcile()
+
+    def on_status_change(self):
+        """有人/无人状态变化（由 HealthScheduler 在调度线程里调用）"""
+        with self.lock:
+            if self.is_running:
+                self.process_working_session(self.video_processor.status.is_person_detected)
 
     def process_working_session(self, is_person_detected):
         """
@@ -83,19 +94,22 @@ class HealthAnalyze:
         参数:
             is_person_detected: 是否检测到人
         """
-        db = next(get_db())
-        try:
-            # 如果检测到人，但没有活动的工作会话，则创建新会话
-            if is_person_detected and not self.current_working_session_id:
-                print("crud: person detected, starting new working session")
-                session = crud.start_working_session(db, monitor_video_url=self.monitor_video_url) # Pass monitor_video_url
-                self.current_working_session_id = session.id
-            # 如果没有检测到人，但有活动的工作会话，则结束会话
-            elif not is_person_detected and self.current_working_session_id:
-                crud.end_working_session(db, self.current_working_session_id)
-                self.current_working_session_id = None
-        finally:
-            db.close()
+        # 如果检测到人，但没有活动的工作会话，则创建新会话
+        if is_person_detected and not self.current_working_session:
+            print("crud: person detected, starting new working session")
+            start_time = int(time.time())
+            self.current_working_session = session_writer.start_session(self.monitor_video_url, start_time)
+            self.work_duration.on_session_start(start_time)
+        # 如果没有检测到人，但有活动的工作会话，则结束会话
+        elif not is_person_detected and self.current_working_session:
+            self._end_working_session()
+
+    def _end_working_session(self):
+        session = self.current_working_session
+        end_time = int(time.time())
+        session_writer.end_session(session, end_time)
+        self.work_duration.on_session_end(session.start_time, end_time)
+        self.current_working_session = None
 
     # process_activity_status method removed
     # process_water_intake method removed
@@ -0,0 +1,66 @@
+import queue
+import threading
+import time
+import traceback
+
+
+class HealthScheduler:
+    """
+    所有 HealthAnalyze 共用的一个调度线程（原来每个 monitor 一个每秒醒来的线程）：
+    - 每整秒统一醒来一次，依次调用各 HealthAnalyze.tick()（状态时序、会话兜底检查），每次 O(monitor 数) 的内存操作
+    - VideoProcessor 的有人/无人状态变化时立即通知，不用等到下一秒
+    线程数固定为 1，唤醒次数为每秒 1 次加上状态变化次数，与 monitor 数量无关
+    回调里不能做阻塞操作（数据库对账等放到数据库线程池），否则会拖慢所有 monitor
+    """
+
+    def __init__(self):
+        self.analyzers = []
+        # 只保护 analyzers 列表；回调与 HealthAnalyze.stop() 的互斥由各 HealthAnalyze 自己的锁负责
+        self.lock = threading.Lock()
+        self.events: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread = None
+
+    def add(self, analyzer):
+        with self.lock:
+            self.analyzers.append(analyzer)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, daemon=True)
+                self.thread.start()
+
+    def remove(self, analyzer):
+        with self.lock:
+            if analyzer in self.analyzers:
+                self.analyzers.remove(analyzer)
+
+    def notify(self, analyzer):
+        """状态变化通知（任意线程调用，非阻塞）"""
+        self.events.put(analyzer)
+
+    def _run(self, callback, analyzer):
+        try:
+            callback()
+        except Exception as e:
+            print(f"[HealthScheduler] {analyzer.monitor_video_url} 分析过程中出错: {e}")
+            traceback.print_exc()
+
+    def _loop(self):
+        next_tick = int(time.time()) + 1
+        while True:
+            try:
+                analyzer = self.events.get(timeout=max(next_tick - time.time(), 0))
+                self._run(analyzer.on_status_change, analyzer)
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            if now < next_tick:
+                continue
+            with self.lock:
+                analyzers = list(self.analyzers)
+            for analyzer in analyzers:
+                self._run(analyzer.tick, analyzer)
+            # 落后太多（如系统休眠）时不补跑，直接对齐到下一秒
+            next_tick = max(next_tick + 1, int(now) + 1)
+
+
+health_scheduler = HealthScheduler()
@@ -1,40 +1,157 @@
 import os
+import queue
 import time
-from datetime import datetime
 import threading
 
+
+class LogWriter:
+    """
+    所有 ActivityLogger 共用的后台写日志线程：
+    入队不阻塞（队列满时直接丢弃并计数），写线程批量写入、文件常开，按大小和日期轮转
+    写线程在第一条日志入队时才启动，停止服务时调用 close 写完剩余日志并关闭文件
+    """
+    QUEUE_SIZE = 10000
+    MAX_BATCH = 1000
+    MAX_BYTES = 20 * 1024 * 1024  # 单个日志文件上限
+    BACKUP_COUNT = 5  # 每个日志保留的轮转文件数
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self.files = {}  # path -> (文件对象, 打开时的日期)
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.written = 0
+        self._time_cache = (None, "")
+        self.thread = None
+        self.lock = threading.Lock()
+        self.files_lock = threading.Lock()  # 写批次与 close 互斥
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._write_loop, daemon=True)
+                self.thread.start()
+
+    def enqueue(self, path: str, timestamp: float, tag: str, message):
+        """非阻塞入队，message 可以是字符串或 dict（在写线程里格式化）"""
+        if self.thread is None:
+            self._ensure_started()
+        try:
+            self.queue.put_nowait((path, timestamp, tag, message))
+        except queue.Full:
+            self.dropped += 1
+
+    def _format_time(self, timestamp: float) -> str:
+        # 同一秒内的记录复用格式化好的日期部分
+        second = int(timestamp)
+        if self._time_cache[0] != second:
+            self._time_cache = (second, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second)))
+        return f"{self._time_cache[1]}.{int((timestamp - second) * 1000):03d}"
+
+    def _format(self, timestamp: float, tag: str, message) -> str:
+        if isinstance(message, dict):
+            message = " ".join(f"{key}={value}" for key, value in message.items())
+        return f"[{self._format_time(timestamp)}] [{tag}] {message}\n"
+
+    def _write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.MAX_BATCH:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                with self.files_lock:
+                    self._write_batch(batch)
+            except Exception as e:
+                print(f"[LogWriter] 写日志失败: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self):
+        """等待已入队的日志全部写入"""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """写完剩余日志并关闭所有文件（停止服务时调用；之后再有日志会重新打开文件）"""
+        self.flush()
+        with self.files_lock:
+            for f, _ in self.files.values():
+                f.close()
+            self.files = {}
+
+    def _write_batch(self, batch: list):
+        lines = {}
+        for path, timestamp, tag, message in batch:
+            lines.setdefault(path, []).append(self._format(timestamp, tag, message))
+        if self.dropped != self.reported_dropped:
+            for path in lines:
+                lines[path].append(self._format(time.time(), "LogWriter",
+                                                f"队列已满，累计丢弃 {self.dropped} 条日志"))
+            self.reported_dropped = self.dropped
+        for path, path_lines in lines.items():
+            f = self._open(path)
+            f.write("".join(path_lines))
+            f.flush()
+        self.written += len(batch)
+
+    def _open(self, path: str):
+        today = time.strftime('%Y%m%d')
+        entry = self.files.get(path)
+        if entry is not None:
+            f, opened_day = entry
+            if opened_day == today and f.tell() < self.MAX_BYTES:
+                return f
+            f.close()
+            self._rotate(path, opened_day)
+        f = open(path, 'a', encoding='utf-8')
+        self.files[path] = (f, today)
+        return f
+
+    def _rotate(self, path: str, day: str):
+        """把当前文件改名为 path.日期-时间，只保留最近 BACKUP_COUNT 个"""
+        if not os.path.exists(path):
+            return
+        os.replace(path, f"{path}.{day}-{time.strftime('%H%M%S')}{int(time.time() * 1000) % 1000:03d}")
+        directory, name = os.path.split(path)
+        backups = sorted(entry for entry in os.listdir(directory or ".") if entry.startswith(name + "."))
+        for old in backups[:-self.BACKUP_COUNT]:
+            os.remove(os.path.join(directory, old))
+
+
+log_writer = LogWriter()
+
+
 class ActivityLogger:
-    """活动检测日志记录类"""
-    
-    def __init__(self, log_dir=None):
+    """活动检测日志记录类（每个 monitor 一个，行首带 monitor 标签，实际写入由 LogWriter 后台完成）"""
+
+    def __init__(self, log_dir=None, tag="-"):
         """初始化日志记录器"""
         if log_dir is None:
             log_dir = os.path.dirname(__file__)
-            
+
         self.activity_log_file_path = os.path.join(log_dir, "activity_detection.log")
         self.timing_log_file_path = os.path.join(log_dir, "detection_timing.log")
-        self.log_lock = threading.Lock()
-        
+        self.tag = tag
+
         # 用于构建日志条目的字典
         self.current_log_entry = {}
-    
+
     def log_activity(self, frame_id, diff_ratio, is_active):
         """
         记录活动检测信息
-        
+
         参数:
             frame_id: 帧ID
             diff_ratio: 帧差异比例
             is_active: 是否有活动
         """
-        log_line = (
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}] "
-            f"frame_id={frame_id} diff_ratio={diff_ratio:.2f} is_active={is_active}\n"
-        )
-        with self.log_lock:
-            with open(self.activity_log_file_path, 'a', encoding='utf-8') as f:
-                f.write(log_line)
-    
+        log_writer.enqueue(self.activity_log_file_path, time.time(), self.tag,
+                           f"frame_id={frame_id} diff_ratio={diff_ratio:.2f} is_active={is_active}")
+
     def timing(self, key, value):
         """
         设置时间日志条目中的字段
@@ -46,40 +163,28 @@ class ActivityLogger:
         """
         self.current_log_entry[key] = value
         return self
-    
+
     def push(self, verbose=False):
         """
-        提交当前时间日志条目到文件
+        提交当前时间日志条目（非阻塞，格式化在写线程中进行）
         参数:
             verbose: 是否记录详细信息
         返回:
             self: 支持链式调用
         """
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-        
         if not verbose:
-            log_line = (
-                f"[{timestamp}] "
-                f"frame_id={self.current_log_entry.get('frame_id', -1)} "
-                f"fetch={self.current_log_entry.get('fetch', -1)}ms "
-                f"yolo={self.current_log_entry.get('yolo', -1)}ms "
-                f"total={self.current_log_entry.get('total', -1)}ms\n"
-            )
+            entry = {
+                "frame_id": self.current_log_entry.get('frame_id', -1),
+                "fetch": f"{self.current_log_entry.get('fetch', -1)}ms",
+                "yolo": f"{self.current_log_entry.get('yolo', -1)}ms",
+                "total": f"{self.current_log_entry.get('total', -1)}ms",
+            }
         else:
-            # 构建详细日志，包括所有设置的字段
-            parts = [f"[{timestamp}]"]
-            
-            # 添加所有字段
-            for key, value in self.current_log_entry.items():
-                    parts.append(f"{key}={value}")
-            
-            log_line = " ".join(parts) + "\n"
-        
-        with self.log_lock:
-            with open(self.timing_log_file_path, 'a', encoding='utf-8') as f:
-                f.write(log_line)
-        
-        # 重置当前日志条目
+            # 详细日志，包括所有设置的字段
+            entry = self.current_log_entry
+        log_writer.enqueue(self.timing_log_file_path, time.time(), self.tag, entry)
+
+        # 重置当前日志条目（旧的 dict 已交给写线程，不能再修改）
         self.current_log_entry = {}
-        
+
         return self
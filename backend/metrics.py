@@ -0,0 +1,165 @@
+"""
+进程内性能指标：按 monitor 分的延迟直方图和计数器
+- /metrics 输出 Prometheus 文本格式
+- /metrics/summary 输出各直方图的 p50/p95/p99（JSON，供设置页显示）
+已有的统计（UDP 组帧计数、WebSocket 客户端数等）通过 collector 在抓取时读取，不改动热路径
+"""
+import bisect
+import threading
+from typing import Callable
+
+# 直方图桶上界（毫秒），最后一个桶是 +Inf
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+PREFIX = "workhealthy_"
+
+
+class Histogram:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value_ms: float):
+        index = bisect.bisect_left(BUCKETS_MS, value_ms)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value_ms
+            self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """按桶线性插值估算分位数"""
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = BUCKETS_MS[index - 1] if index > 0 else 0
+                upper = BUCKETS_MS[index] if index < len(BUCKETS_MS) else BUCKETS_MS[-1] * 2
+                return round(lower + (upper - lower) * (rank - cumulative) / count, 2)
+            cumulative += count
+        return float(BUCKETS_MS[-1])
+
+
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        with self.lock:
+            self.value += amount
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """全局指标注册表，直方图/计数器按 (名称, 标签) 缓存，调用方拿到对象后直接记录"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: dict[tuple, Histogram] = {}
+        self.counters: dict[tuple, Counter] = {}
+        # 抓取时调用，返回 [(名称, 类型 "gauge"/"counter", 标签 dict, 值)]
+        self.collectors: list[Callable[[], list]] = []
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = (name, _labels_key(labels))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            return self.histograms[key]
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = (name, _labels_key(labels))
+        with self.lock:
+            if key not in self.counters:
+                self.counters[key] = Counter()
+            return self.counters[key]
+
+    def register_collector(self, collector: Callable[[], list]):
+        self.collectors.append(collector)
+
+    def _collect(self) -> list:
+        samples = []
+        for collector in self.collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                print(f"[Metrics] collector 出错: {e}")
+        return samples
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        declared = set()
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for (name, labels), histogram in histograms:
+            declare(name, "histogram")
+            with histogram.lock:
+                counts, total, value_sum = list(histogram.counts), histogram.count, histogram.sum
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS, counts):
+                cumulative += count
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {total}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {value_sum}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {total}")
+        for (name, labels), counter in counters:
+            declare(name, "counter")
+            lines.append(f"{PREFIX}{name}{_format_labels(labels)} {counter.value}")
+        for name, kind, labels, value in self._collect():
+            declare(name, kind)
+            lines.append(f"{PREFIX}{name}{_format_labels(_labels_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """按 monitor 分组：{monitor: {指标名[:stage]: {count, mean, p50, p95, p99} 或数值}}"""
+        result = {}
+        def slot(labels: dict) -> dict:
+            return result.setdefault(labels.get("monitor", "-"), {})
+
+        with self.lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+        for (name, labels), histogram in histograms:
+            labels = dict(labels)
+            key = f"{name}:{labels['stage']}" if "stage" in labels else name
+            slot(labels)[key] = {
+                "count": histogram.count,
+                "mean": round(histogram.sum / histogram.count, 2) if histogram.count else None,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+                "p99": histogram.quantile(0.99),
+            }
+        for (name, labels), counter in counters:
+            slot(dict(labels))[name] = counter.value
+        for name, kind, labels, value in self._collect():
+            slot(labels)[name] = value
+        return result
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,116 @@
+import asyncio
+from typing import Callable, Optional, Union
+
+import cv2
+import numpy as np
+
+
+class MjpegBroadcaster:
+    """
+    每个 monitor 一个的共享 MJPEG 编码器：
+    只有一个编码任务，每帧只画框+编码一次（在线程池里执行，不阻塞事件循环），
+    编码结果广播给所有订阅的 HTTP 客户端。慢客户端直接跳到最新帧，不排队。
+    没有订阅者时编码任务自动停止。
+    每种 (宽度, 质量) 组合是一个独立的实例，同一源帧在每种组合下只编码一次。
+    """
+
+    def __init__(self, render: Callable[[], Union[np.ndarray, bytes, None]], interval: float = 0.05,
+                 on_active: Optional[Callable[[bool], None]] = None,
+                 frame_time: Optional[Callable[[], Optional[int]]] = None,
+                 width: Optional[int] = None, quality: Optional[int] = None):
+        """
+        参数:
+            render: 在线程池中调用，返回要编码的帧（已画好框），或直接返回 JPEG 字节（透传），没有帧时返回 None
+            interval: 检查新帧的间隔（秒）
+            on_active: 编码任务启动/停止时回调，参数为是否有订阅者
+            frame_time: 返回源帧时间戳，源帧没变化时跳过编码
+            width: 缩放到的宽度（保持宽高比，只缩小不放大）
+            quality: JPEG 质量 (1-100)
+        """
+        self.render = render
+        self.interval = interval
+        self.on_active = on_active
+        self.frame_time = frame_time
+        self.width = width
+        self.quality = quality
+        self.last_frame_time: Optional[int] = None
+
+        self.frame_bytes: Optional[bytes] = None
+        self.frame_seq = 0
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.new_frame = asyncio.Condition()
+
+    def _encode(self) -> Optional[bytes]:
+        frame = self.render()
+        if frame is None or isinstance(frame, bytes):
+            return frame
+        if self.width and frame.shape[1] > self.width:
+            height = int(frame.shape[0] * self.width / frame.shape[1])
+            frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality] if self.quality else []
+        ok, jpeg = cv2.imencode('.jpg', frame, params)
+        return jpeg.tobytes() if ok else None
+
+    async def _encode_loop(self):
+        loop = asyncio.get_running_loop()
+        if self.on_active:
+            self.on_active(True)
+        try:
+            while self.subscribers > 0:
+                start = loop.time()
+                frame_time = self.frame_time() if self.frame_time else None
+                if frame_time is not None and frame_time == self.last_frame_time:
+                    # 源帧没变化，不重复编码
+                    await asyncio.sleep(self.interval)
+                    continue
+                self.last_frame_time = frame_time
+                try:
+                    frame_bytes = await asyncio.to_thread(self._encode)
+                except Exception as e:
+                    print(f"[MjpegBroadcaster] 编码出错: {e}")
+                    frame_bytes = None
+                # 透传时同一帧会被重复取到，只在有新帧时广播
+                if frame_bytes is not None and frame_bytes is not self.frame_bytes:
+                    self.frame_bytes = frame_bytes
+                    self.frame_seq += 1
+                    async with self.new_frame:
+                        self.new_frame.notify_all()
+                await asyncio.sleep(max(0.0, self.interval - (loop.time() - start)))
+        finally:
+            self.task = None
+            if self.on_active:
+                self.on_active(False)
+
+    async def subscribe(self, fps: Optional[float] = None):
+        """
+        订阅 MJPEG 流，直接作为 StreamingResponse 的 body
+        参数:
+            fps: 该客户端的最大帧率。发送变慢（socket 写缓冲积压）时自动降低，恢复后逐步回升
+        """
+        loop = asyncio.get_running_loop()
+        target_fps = fps or 1 / self.interval
+        current_fps = target_fps
+        self.subscribers += 1
+        if self.task is None:
+            self.task = asyncio.create_task(self._encode_loop())
+        try:
+            seen_seq = 0
+            while True:
+                async with self.new_frame:
+                    await self.new_frame.wait_for(lambda: self.frame_seq != seen_seq)
+                # 只取最新一帧，中间错过的帧直接跳过
+                seen_seq = self.frame_seq
+                sent_at = loop.time()
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + self.frame_bytes + b'\r\n')
+                # yield 返回前 send 一直阻塞在写缓冲上，耗时即积压程度
+                send_time = loop.time() - sent_at
+                frame_interval = 1 / current_fps
+                if send_time > frame_interval:
+                    current_fps = max(1.0, current_fps / 2)
+                elif current_fps < target_fps:
+                    current_fps = min(target_fps, current_fps + 1)
+                await asyncio.sleep(max(0.0, 1 / current_fps - send_time))
+        finally:
+            self.subscribers -= 1
@@ -1,5 +1,6 @@
 import time
 import threading
+from contextlib import aclosing
 from datetime import datetime, timedelta  # Ensure timedelta is here
 # from turtle import st # Removed unused import
 # from sqlalchemy.orm import Session # Session not directly used in this file
@@ -8,7 +9,10 @@ from .video_processor import VideoProcessor
 from .genterator import GeneratorService
 from .health_analyze import HealthAnalyze
 from .current import CurrentProcessor
+from .mjpeg_stream import MjpegBroadcaster
+from .status_codec import render_insights
 import os
+from dataclasses import asdict
 
 
 class Monitor:
@@ -26,9 +30,15 @@ class Monitor:
         self.video_processor = VideoProcessor(video_url)
         if current_sensor_url is not None:
             self.current_processor = CurrentProcessor(current_sensor_url)
-        self.health_analyze = HealthAnalyze(self.video_processor)
+        self.health_analyze = HealthAnalyze(self.video_processor, getattr(self, 'current_processor', None))
         self.generator_service = GeneratorService()
 
+        # 共享的视频流编码器，所有观看者复用同一份 JPEG
+        # (raw, width, quality) -> MjpegBroadcaster，见 subscribe_video_feed
+        self.video_feeds: dict[tuple, MjpegBroadcaster] = {}
+        self.video_feed_with_faces = MjpegBroadcaster(
+            self._render_video_frame_with_faces, on_active=self._set_face_processing)
+
         self.is_running = False
         self.monitor_thread = None
 
@@ -49,59 +59,110 @@ class Monitor:
 
         print("健康监测服务已停止")
 
-    def output_insights(self):
-        """获取当前状态见解 胖服务端策略：字符串在服务端合成"""
-        insights = {}
-        db = None
-
-        # 需要数据库的
-        try:
-            db = next(get_db())
-            today_work_duration_seconds = crud.get_today_work_duration(
-                db, self.video_processor.video_url)
-
-            # today_work_duration_seconds 是 timedelta 的 int
-            formatted_duration = str(
-                timedelta(seconds=int(today_work_duration_seconds or 0)))
-            insights["today_work_duration_message"] = f"{formatted_duration}"
-            if today_work_duration_seconds and today_work_duration_seconds >= 120:  # Original threshold was 120 seconds
-                insights["today_work_duration_message"] += "\n已工作较长时间!"
-            elif today_work_duration_seconds and today_work_duration_seconds > 0:
-                insights["today_work_duration_message"] += "\n请继续保持！"
+    async def subscribe_video_feed(self, raw: bool = False, width: int = None, quality: int = None,
+                                   fps: float = None):
+        """
+        订阅指定规格的共享视频流，同规格的客户端共用一个编码器，直接作为 StreamingResponse 的 body
+        raw: 不画检测框；且未指定 width/quality 时直接透传摄像头原始 JPEG
+        开始推流时才创建编码器，最后一个订阅者断开时移除，开始推流前就断开的客户端不会留下空的编码器
+        """
+        key = (raw, width, quality)
+        feed = self.video_feeds.get(key)
+        if feed is None:
+            if raw and width is None and quality is None:
+                render = self._render_raw_jpeg
+            elif raw:
+                render = self.video_processor.get_latest_frame
             else:
-                insights["today_work_duration_message"] += "\n暂无工作记录"
-
-        except Exception as e:
-            print(f"在数据库获取今日工作时长时出错: {e}")
-            insights["today_work_duration_message"] = "获取工作时长信息时出错。"
+                render = self._render_video_frame
+            feed = self.video_feeds[key] = MjpegBroadcaster(
+                render, frame_time=self.video_processor.get_latest_frame_time, width=width, quality=quality)
+        try:
+            async with aclosing(feed.subscribe(fps)) as frames:
+                async for frame in frames:
+                    yield frame
         finally:
-            if db:  # Check if db was successfully assigned
-                try:
-                    db.close()
-                except Exception as e:
-                    print(f"关闭数据库连接时出错: {e}")
-
-        # Add AI generator summary
-        if hasattr(self, 'generator_service') and hasattr(self.generator_service, 'summary_health_message'):
-            insights["generator_summary_health_message"] = self.generator_service.summary_health_message
-        else:
-            insights["generator_summary_health_message"] = "AI健康摘要服务不可用。"
-
-        # Add water intake message
-        if hasattr(self, 'video_processor') and hasattr(self.video_processor, 'status'):
-            if self.video_processor.status.is_cup_detected:
-                insights["water_intake_message"] = "检测到水杯，请及时喝水！"
-            else:
-                insights["water_intake_message"] = "未检测到水杯，请注意补水！"
-        else:
-            insights["water_intake_message"] = "水杯检测状态不可用。"
-
-        if hasattr(self, 'current_processor'):
-            insights["current_power_message"] = f"{self.current_processor.power:.2f} W"
-
-        return insights
+            if feed.subscribers == 0 and self.video_feeds.get(key) is feed:
+                del self.video_feeds[key]
+
+    def _render_video_frame(self):
+        """视频流帧：带 YOLO 检测框"""
+        frame = self.video_processor.get_latest_frame()
+        yolo_detector = getattr(self.video_processor, 'yolo_detector', None)
+        if frame is not None and yolo_detector is not None:
+            frame = yolo_detector.result.draw_boxes_on(frame)
+        return frame
+
+    def _render_video_frame_with_faces(self):
+        """视频流帧：带人脸识别框"""
+        frame = self.video_processor.get_latest_frame()
+        face_signin = getattr(self.video_processor, 'face_signin', None)
+        if frame is not None and face_signin is not None:
+            frame = face_signin.result.draw_boxes_on(frame)
+        return frame
+
+    def _render_raw_jpeg(self):
+        """透传摄像头原始 JPEG；摄像头不提供 JPEG（如 CV2）时才编码"""
+        jpeg = self.video_processor.get_latest_jpeg()
+        if jpeg is not None:
+            return jpeg
+        return self.video_processor.get_latest_frame()
+
+    def _set_face_processing(self, enable: bool):
+        """有人观看人脸识别视频流时才启用人脸处理"""
+        self.video_processor.enable_face_processing = enable
+
+    def output_boxes(self):
+        """当前检测框，供原始视频流的前端叠加绘制"""
+        boxes = []
+        # 关闭的阶段不再更新结果，跳过，避免前端一直画着关闭前最后一次的框
+        for detector, enabled in (('yolo_detector', self.video_processor.enable_yolo_processing),
+                                  ('face_signin', self.video_processor.enable_face_processing)):
+            detector = getattr(self.video_processor, detector, None)
+            if detector is None or not enabled:
+                continue
+            for box in detector.result.boxes:
+                boxes.append({
+                    "x1": int(box.x1), "y1": int(box.y1),
+                    "x2": int(box.x2), "y2": int(box.y2),
+                    "class_name": box.class_name,
+                    "confidence": round(float(box.confidence), 2),
+                })
+        return {"timestamp": int(time.time()), "boxes": boxes}
+
+    def output_status(self) -> dict:
+        """
+        获取当前结构化状态（与语言、编码无关）
+        由 status_codec 渲染为 insights 文字（json）或编码为定长二进制帧
+        """
+        # 内存累加器 O(1) 读取，不访问数据库
+        today_work_seconds = self.health_analyze.work_duration.today_seconds()
+
+        # 只取一次快照，保证各字段来自同一次分析
+        status = self.video_processor.status
+        analytics = self.health_analyze.analytics.snapshot
+        return {
+            "today_work_seconds": today_work_seconds,  # None 表示获取失败
+            "summary": self.generator_service.summary_health_message,
+            "is_active": status.is_active,
+            "is_person_detected": status.is_person_detected,
+            "is_cup_detected": status.is_cup_detected,
+            "power": self.current_processor.power if hasattr(self, 'current_processor') else None,
+            "sitting_seconds": analytics.sitting_seconds,
+            "minutes_since_cup": analytics.minutes_since_cup,
+            "active_ratio": analytics.active_ratio,
+            "power_on_seconds": analytics.power_on_seconds,
+            "alerts": analytics.alerts,
+        }
+
+    def output_insights(self, lang: str = "zh"):
+        """获取当前状态见解 胖服务端策略：字符串在服务端合成"""
+        return render_insights(self.output_status(), lang)
 
     def refresh_generator_summary_health(self):
         """刷新生成器摘要"""
-        self.generator_service.refresh_summary_health(
-            self.video_processor.status)
+        # 检测快照 + 增量分析结果（久坐、喝水、活动比例等）
+        self.generator_service.refresh_summary_health({
+            **asdict(self.video_processor.status),
+            **asdict(self.health_analyze.analytics.snapshot),
+        })
@@ -1,9 +1,25 @@
+import re
 import threading
-from typing import Dict, Optional
+import urllib.parse
+from functools import lru_cache
+from typing import Dict, Optional, Set
 from .monitor import Monitor
 from .camera_capture import create_camera_capture
 
 
+def camera_ip_of(video_url: str) -> Optional[str]:
+    """从 video_url 中取出摄像头 IP"""
+    if video_url.startswith("udpserver://"):
+        # udpserver://0.0.0.0:8099/192.168.1.100
+        return video_url.rsplit("/", 1)[-1]
+    return urllib.parse.urlsplit(video_url).hostname
+
+
+def tokens_of(video_url: str) -> Set[str]:
+    """把 video_url 拆成关键词（前端把 : 和 / 替换成了 -）"""
+    return {token for token in re.split(r"[:/?&=\-]+", video_url) if token}
+
+
 class MonitorRegistry:
     """管理多个摄像头的Monitor实例"""
 
@@ -11,19 +27,85 @@ class MonitorRegistry:
         """初始化监控注册表"""
         # video_url -> Monitor实例
         self.monitors: Dict[str, Monitor] = {}
+        # 索引：摄像头IP -> video_url，关键词 -> {video_url}，video_url -> 注册顺序
+        self.ip_index: Dict[str, str] = {}
+        self.token_index: Dict[str, Set[str]] = {}
+        self.register_order: Dict[str, int] = {}
+        self.register_count = 0
+        # 模糊别名 -> video_url 的 LRU 缓存，注册/注销时清空
+        self._resolve_fuzzy = lru_cache(maxsize=256)(self._resolve_fuzzy_uncached)
 
     def register(self, video_url: str, current_sensor_url: Optional[str] = None):
         """注册摄像头"""
-        for existing_url in self.monitors.keys():
-            if existing_url == video_url:
-                print(f"摄像头 {video_url} 已经注册，跳过重复注册")
-                return
+        if video_url in self.monitors:
+            print(f"摄像头 {video_url} 已经注册，跳过重复注册")
+            return
         # 创建新的Monitor实例
         self.monitors[video_url] = Monitor(video_url=video_url,
                                            current_sensor_url=current_sensor_url)
         self.monitors[video_url].start()  # 启动Monitor
+
+        camera_ip = camera_ip_of(video_url)
+        if camera_ip:
+            self.ip_index[camera_ip] = video_url
+        for token in tokens_of(video_url):
+            self.token_index.setdefault(token, set()).add(video_url)
+        self.register_count += 1
+        self.register_order[video_url] = self.register_count
+        self._resolve_fuzzy.cache_clear()
         return self # 供链式调用
 
+    def unregister(self, video_url: str):
+        """注销摄像头"""
+        monitor = self.monitors.pop(video_url, None)
+        if monitor is None:
+            return
+        monitor.stop()
+
+        camera_ip = camera_ip_of(video_url)
+        if camera_ip and self.ip_index.get(camera_ip) == video_url:
+            del self.ip_index[camera_ip]
+        for token in tokens_of(video_url):
+            urls = self.token_index.get(token)
+            if urls is not None:
+                urls.discard(video_url)
+                if not urls:
+                    del self.token_index[token]
+        self.register_order.pop(video_url, None)
+        self._resolve_fuzzy.cache_clear()
+
+    def resolve(self, blur_video_url: str) -> Optional[str]:
+        """把完整 URL 或模糊 id（以连字符分隔的多个关键词）解析为已注册的 video_url"""
+        if blur_video_url in self.monitors:
+            return blur_video_url
+        return self._resolve_fuzzy(blur_video_url)
+
+    def resolve_by_ip(self, ip: str) -> Optional[str]:
+        """根据摄像头 IP 查找（"MY" 特例：对端就是摄像头本身）"""
+        return self.ip_index.get(ip) or self.resolve(ip)
+
+    def _resolve_fuzzy_uncached(self, blur_video_url: str) -> Optional[str]:
+        keywords = [kw.strip() for kw in blur_video_url.split("-") if kw.strip()]
+        if not keywords:
+            return None
+
+        # 先按关键词索引求交集
+        candidates = None
+        for kw in keywords:
+            urls = self.token_index.get(kw)
+            if not urls:
+                candidates = None
+                break
+            candidates = urls if candidates is None else candidates & urls
+        if candidates:
+            return min(candidates, key=self.register_order.get)
+
+        # 关键词不是完整 token 时退回子串匹配（结果会被 LRU 缓存）
+        for existing_url in self.monitors.keys():
+            if all(kw in existing_url for kw in keywords):
+                return existing_url
+        return None
+
     def start_all(self):
         """启动所有Monitor"""
         for monitor in self.monitors.values():
@@ -0,0 +1,97 @@
+"""
+运行中在线 profiling（不需要重启服务）：
+- ThreadProfiler: 在目标线程自己的循环里开关 cProfile（cProfile 只分析调用 enable 的线程），输出 .prof
+- sample_threads: 定时抓取各线程的调用栈（sys._current_frames），输出 speedscope JSON
+同一时间只允许一个 profiling 会话（profile_lock）
+"""
+import cProfile
+import marshal
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+MAX_SECONDS = 60
+SAMPLE_INTERVAL = 0.005
+
+profile_lock = threading.Lock()
+
+
+class ThreadProfiler:
+    """由被分析的线程在每次循环时调用 step()，到时间后把 .prof 内容交给请求方的 Future"""
+
+    def __init__(self):
+        self.pending: tuple[float, Future] | None = None
+        self.active: tuple[cProfile.Profile, float, Future] | None = None
+
+    def request(self, seconds: float) -> Future:
+        future = Future()
+        self.pending = (seconds, future)
+        return future
+
+    def step(self):
+        if self.active is None:
+            if self.pending is None:
+                return
+            (seconds, future), self.pending = self.pending, None
+            profile = cProfile.Profile()
+            self.active = (profile, time.monotonic() + seconds, future)
+            profile.enable()
+        elif time.monotonic() >= self.active[1]:
+            (profile, _, future), self.active = self.active, None
+            profile.disable()
+            profile.create_stats()
+            # 与 Profile.dump_stats 写出的 .prof 格式相同，可用 pstats / snakeviz 打开
+            future.set_result(marshal.dumps(profile.stats))
+
+
+def sample_threads(seconds: float, thread_ids: set[int] | None = None,
+                   interval: float = SAMPLE_INTERVAL) -> dict:
+    """对所有线程（或指定线程）采样调用栈，返回 speedscope 格式（https://www.speedscope.app 打开）"""
+    frame_index: dict[tuple, int] = {}
+    frames: list[dict] = []
+    profiles: dict[int, dict] = {}
+    own_id = threading.get_ident()
+    started = last = time.perf_counter()
+    deadline = started + seconds
+
+    while True:
+        now = time.perf_counter()
+        weight = now - last
+        last = now
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (thread_ids is not None and thread_id not in thread_ids):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_name, code.co_filename, code.co_firstlineno)
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                stack.append(frame_index[key])
+                frame = frame.f_back
+            stack.reverse()
+            profile = profiles.setdefault(thread_id, {"samples": [], "weights": []})
+            profile["samples"].append(stack)
+            profile["weights"].append(weight)
+        if now >= deadline:
+            break
+        time.sleep(interval)
+
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"workhealthy {seconds}s",
+        "exporter": "workhealthy",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": f"{names.get(thread_id, 'thread')} ({thread_id})",
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": last - started,
+            "samples": profile["samples"],
+            "weights": profile["weights"],
+        } for thread_id, profile in profiles.items()],
+    }
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+
+class SigninImageStore:
+    """
+    签到图片存储：
+    - 按 JPEG 内容的哈希命名（{sha256}.jpg），同一帧重复签到只存一份，同一秒多次签到也不会互相覆盖
+    - 优先直接保存摄像头原始 JPEG，没有时才重新编码
+    - 同时生成缩略图（{sha256}_thumb.jpg）供签到记录列表使用
+    - 超过保留期的图片每天在后台线程清理一次（复用的图片会刷新修改时间），并通过 on_expired 删除引用它们的签到记录
+    所有文件操作都是同步的，在事件循环里请用 save_async
+    """
+    THUMB_WIDTH = 160
+    RETENTION_DAYS = 90
+    COMPACT_INTERVAL = 24 * 3600
+
+    def __init__(self, root: str, on_expired: Optional[Callable[[list[str]], None]] = None):
+        """on_expired: 清理后以被删除的图片文件名列表调用（在清理线程里），用于删除对应的签到记录"""
+        self.root = root
+        self.on_expired = on_expired
+        self.lock = threading.Lock()
+        self.last_compact = 0
+
+    def image_path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def thumbnail_name(self, name: str) -> str:
+        """缩略图文件名；旧版按时间戳命名的图片（signin_{ts}.jpg）没有缩略图，直接用原图"""
+        if name.startswith("signin_"):
+            return name
+        return name.replace(".jpg", "_thumb.jpg")
+
+    def save(self, jpeg: Optional[bytes], get_frame: Optional[Callable[[], Optional[np.ndarray]]] = None
+             ) -> Optional[str]:
+        """
+        保存签到图片，返回图片文件名（相对 root），没有可用图像时返回 None
+        get_frame: 没有原始 JPEG 时才调用，取 BGR 帧重新编码（拷贝整帧，所以不提前取）
+        """
+        if jpeg is None:
+            frame = get_frame() if get_frame is not None else None
+            if frame is None:
+                return None
+            ok, encoded = cv2.imencode('.jpg', frame)
+            if not ok:
+                return None
+            jpeg = encoded.tobytes()
+
+        name = hashlib.sha256(jpeg).hexdigest() + ".jpg"
+        path = self.image_path(name)
+        os.makedirs(self.root, exist_ok=True)
+        with self.lock:
+            if os.path.exists(path):
+                # 内容相同，复用已有文件，只刷新修改时间避免被清理
+                os.utime(path)
+            else:
+                self._write_atomic(path, jpeg)
+                self._write_thumbnail(jpeg, self.image_path(self.thumbnail_name(name)))
+        self.maybe_compact()
+        return name
+
+    async def save_async(self, jpeg: Optional[bytes],
+                         get_frame: Optional[Callable[[], Optional[np.ndarray]]] = None) -> Optional[str]:
+        return await asyncio.to_thread(self.save, jpeg, get_frame)
+
+    def _write_atomic(self, path: str, data: bytes):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _write_thumbnail(self, jpeg: bytes, path: str):
+        # 解码时直接缩小到 1/4，比完整解码再缩放快得多
+        image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_REDUCED_COLOR_4)
+        if image is None:
+            return
+        if image.shape[1] > self.THUMB_WIDTH:
+            height = int(image.shape[0] * self.THUMB_WIDTH / image.shape[1])
+            image = cv2.resize(image, (self.THUMB_WIDTH, height), interpolation=cv2.INTER_AREA)
+        ok, thumb = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        if ok:
+            self._write_atomic(path, thumb.tobytes())
+
+    def maybe_compact(self):
+        """到了清理时间就在后台线程清理，不占用签到请求"""
+        if time.time() - self.last_compact >= self.COMPACT_INTERVAL:
+            # 先更新时间，避免清理完成前的签到重复启动清理
+            self.last_compact = time.time()
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self) -> int:
+        """删除超过保留期的图片及其缩略图，以及中断写入留下的临时文件，返回删除的文件数"""
+        self.last_compact = time.time()
+        if not os.path.isdir(self.root):
+            return 0
+        expire_before = self.last_compact - self.RETENTION_DAYS * 24 * 3600
+        removed = 0
+        expired_images = []
+        with self.lock:
+            for entry in os.scandir(self.root):
+                if not entry.is_file() or entry.name.endswith("_thumb.jpg"):
+                    continue
+                stale_tmp = entry.name.endswith(".tmp") and entry.stat().st_mtime < self.last_compact - 3600
+                if stale_tmp or entry.stat().st_mtime < expire_before:
+                    os.remove(entry.path)
+                    removed += 1
+                    if not entry.name.endswith(".jpg"):
+                        continue
+                    expired_images.append(entry.name)
+                    thumb_path = self.image_path(self.thumbnail_name(entry.name))
+                    if thumb_path != entry.path and os.path.exists(thumb_path):
+                        os.remove(thumb_path)
+                        removed += 1
+        if removed:
+            print(f"[SigninImageStore] 清理了 {removed} 个过期文件")
+        if expired_images and self.on_expired is not None:
+            try:
+                self.on_expired(expired_images)
+            except Exception as e:
+                print(f"[SigninImageStore] 删除过期签到记录失败: {e}")
+        return removed
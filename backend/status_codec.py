@@ -0,0 +1,117 @@
+"""
+状态推送的编码：
+- json: 服务端按语言渲染好文字（胖服务端），供 Vue 前端
+- binary: 定长结构体 + 消息 id，嵌入式端按本地文字表渲染，省 Wi-Fi 带宽和 JSON 解析
+
+binary 帧格式（小端）:
+    状态帧   STATUS_HEADER: u8 类型=1, u8 标志位, u32 时间戳, u32 今日在岗秒数, u16 功率(0.1W),
+             u8 工作时长消息id, u8 喝水消息id, u16 AI摘要长度; 之后是 UTF-8 AI 摘要（只在变化/快照时携带）
+    心跳帧   HEARTBEAT: u8 类型=0, u32 时间戳
+"""
+import struct
+from datetime import timedelta
+from functools import lru_cache
+
+ENCODINGS = ("json", "binary")
+
+MSG_TYPE_HEARTBEAT = 0
+MSG_TYPE_STATUS = 1
+STATUS_HEADER = struct.Struct("<BBIIHBBH")
+HEARTBEAT = struct.Struct("<BI")
+
+FLAG_ACTIVE = 1 << 0
+FLAG_PERSON = 1 << 1
+FLAG_CUP = 1 << 2
+FLAG_HAS_POWER = 1 << 3
+
+# 消息 id，与固件端文字表一一对应，只能追加不能改顺序
+WORK_NO_RECORD, WORK_KEEP_GOING, WORK_TOO_LONG, WORK_ERROR = range(4)
+WATER_NO_CUP, WATER_CUP = range(2)
+
+MESSAGES = {
+    "zh": {
+        "work": ["暂无工作记录", "请继续保持！", "已工作较长时间!", "获取工作时长信息时出错。"],
+        "water": ["未检测到水杯，请注意补水！", "检测到水杯，请及时喝水！"],
+        "sitting": "已连续久坐 {duration}",
+        "active_ratio": "活动比例 5分钟 {0} / 30分钟 {1} / 60分钟 {2}",
+        "alerts": {"sedentary": "坐太久了，起来活动一下吧！", "hydration": "已经 {minutes} 分钟没喝水了！"},
+    },
+    "en": {
+        "work": ["No work record yet", "Keep it up!", "You've been working for a long time!",
+                 "Failed to get work duration."],
+        "water": ["No cup detected, remember to drink water!", "Cup detected, drink some water!"],
+        "sitting": "Sitting for {duration}",
+        "active_ratio": "Active 5 min {0} / 30 min {1} / 60 min {2}",
+        "alerts": {"sedentary": "You've been sitting too long, take a break!",
+                   "hydration": "No water for {minutes} minutes!"},
+    },
+}
+LANGUAGES = tuple(MESSAGES.keys())
+
+
+def work_message_id(today_work_seconds: int | None) -> int:
+    if today_work_seconds is None:
+        return WORK_ERROR
+    if today_work_seconds >= 120:
+        return WORK_TOO_LONG
+    if today_work_seconds > 0:
+        return WORK_KEEP_GOING
+    return WORK_NO_RECORD
+
+
+@lru_cache(maxsize=1024)
+def render_work_duration(today_work_seconds: int | None, lang: str) -> str:
+    """工作时长文字，按 (秒数, 语言) 缓存"""
+    message = MESSAGES[lang]["work"][work_message_id(today_work_seconds)]
+    if today_work_seconds is None:
+        return message
+    return f"{timedelta(seconds=today_work_seconds)}\n{message}"
+
+
+def render_insights(status: dict, lang: str = "zh") -> dict:
+    """把 Monitor.output_status() 的结构化状态渲染成 insights 文字"""
+    insights = {
+        "today_work_duration_message": render_work_duration(status["today_work_seconds"], lang),
+        "generator_summary_health_message": status["summary"],
+        "water_intake_message": MESSAGES[lang]["water"][WATER_CUP if status["is_cup_detected"] else WATER_NO_CUP],
+    }
+    if status["power"] is not None:
+        insights["current_power_message"] = f"{status['power']:.2f} W"
+    messages = MESSAGES[lang]
+    insights["sitting_message"] = messages["sitting"].format(
+        duration=timedelta(seconds=status["sitting_seconds"])) if status["sitting_seconds"] else ""
+    # 窗口顺序与 analytics.ACTIVE_WINDOWS_MINUTES 一致
+    insights["active_ratio_message"] = messages["active_ratio"].format(
+        *("-" if ratio is None else f"{ratio:.0%}" for ratio in status["active_ratio"].values()))
+    # 提醒（没有提醒时为空字符串，增量推送时能清掉之前的提醒）
+    insights["alert_message"] = "\n".join(
+        messages["alerts"][alert].format(minutes=status["minutes_since_cup"] or "60+") for alert in status["alerts"])
+    return insights
+
+
+def encode_binary_status(status: dict, timestamp: int, with_summary: bool) -> bytes:
+    """编码定长状态帧，with_summary 时附带 AI 摘要原文"""
+    flags = 0
+    if status["is_active"]:
+        flags |= FLAG_ACTIVE
+    if status["is_person_detected"]:
+        flags |= FLAG_PERSON
+    if status["is_cup_detected"]:
+        flags |= FLAG_CUP
+    power = 0
+    if status["power"] is not None:
+        flags |= FLAG_HAS_POWER
+        # 0.1 W 精度的 uint16，负值（传感器噪声）和超量程都夹到范围内，否则 struct.pack 会抛异常
+        power = max(0, min(int(status["power"] * 10), 0xFFFF))
+    # 截断到 uint16 长度时丢掉被切开的半个 UTF-8 字符，前端按 UTF-8 解码不会出错
+    summary = status["summary"].encode("utf-8")[:0xFFFF].decode("utf-8", "ignore").encode("utf-8") \
+        if with_summary else b""
+    return STATUS_HEADER.pack(
+        MSG_TYPE_STATUS, flags, timestamp, status["today_work_seconds"] or 0, power,
+        work_message_id(status["today_work_seconds"]),
+        WATER_CUP if status["is_cup_detected"] else WATER_NO_CUP,
+        len(summary)) + summary
+
+
+def encode_binary_heartbeat(timestamp: int) -> bytes:
+    return HEARTBEAT.pack(MSG_TYPE_HEARTBEAT, timestamp)
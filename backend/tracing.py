@@ -0,0 +1,87 @@
+"""
+帧级链路追踪：一帧从第一个 UDP 分片到达，到组帧、解码、排队、各分析阶段、状态发布、WebSocket 发出的各段耗时
+
+采集线程只记录每帧的时间戳（见 BaseCameraCapture._update_frame），是否追踪由处理线程取帧时决定：
+每个 monitor 各自计数，每分析 SAMPLE_EVERY 帧追踪一帧，再把这一帧的网络/组帧/解码阶段补进追踪。
+完成分析的追踪放进环形缓冲区，
+可导出为 Chrome trace JSON（chrome://tracing 或 https://ui.perfetto.dev 打开）。
+时间戳统一用 time.time_ns()，这样不同线程、不同阶段的时间可以直接比较。
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+SAMPLE_EVERY = 10
+RING_SIZE = 1000
+
+# Chrome trace 里每个 monitor 是一个进程，阶段按所在线程分到三条轨道
+TRACKS = {
+    "network": 1, "reassembly": 1, "decode": 1,
+    "queue": 2, "yolo": 2, "face": 2, "activity": 2, "analysis": 2, "publish": 2,
+    "push_encode": 3, "ws_send": 3,
+}
+TRACK_NAMES = {1: "camera", 2: "video_processor", 3: "push"}
+
+
+class FrameTrace:
+    __slots__ = ("frame_id", "monitor", "version", "spans")
+
+    def __init__(self, frame_id):
+        self.frame_id = frame_id
+        self.monitor = "-"
+        # 这一帧分析后发布的 DetectionStatus 版本，状态没变时为 None
+        self.version = None
+        self.spans = []  # (名称, 开始 ns, 结束 ns, 附加参数)
+
+    def add(self, name: str, start_ns: int, end_ns: int | None = None, **args):
+        # list.append 是原子的，推送任务和处理线程可以同时追加
+        self.spans.append((name, start_ns, time.time_ns() if end_ns is None else end_ns, args))
+
+
+class Tracer:
+    def __init__(self):
+        self.traces: deque[FrameTrace] = deque(maxlen=RING_SIZE)
+        self.lock = threading.Lock()
+
+    def start(self, counter: itertools.count, capture_timing=None) -> FrameTrace | None:
+        """
+        采样决定（counter 是调用方自己的帧计数器）：需要追踪这一帧时返回 FrameTrace，否则返回 None
+        capture_timing 是采集线程记录的 (帧号, 阶段列表)，阶段是 (名称, 开始 ns, 结束 ns, 附加参数)
+        """
+        if next(counter) % SAMPLE_EVERY:
+            return None
+        if capture_timing is None:
+            return FrameTrace(None)
+        frame_id, spans = capture_timing
+        trace = FrameTrace(frame_id)
+        trace.spans.extend(spans)
+        return trace
+
+    def finish(self, trace: FrameTrace):
+        """分析完成的追踪放入环形缓冲区（之后的推送阶段仍会追加到同一对象上）"""
+        with self.lock:
+            self.traces.append(trace)
+
+    def export_chrome(self, monitor: str | None = None) -> dict:
+        with self.lock:
+            traces = [trace for trace in list(self.traces) if monitor is None or trace.monitor == monitor]
+        pids = {}
+        events = []
+        for trace in traces:
+            if trace.monitor not in pids:
+                pid = pids[trace.monitor] = len(pids) + 1
+                events.append({"ph": "M", "name": "process_name", "pid": pid, "args": {"name": trace.monitor}})
+                for tid, track_name in TRACK_NAMES.items():
+                    events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid,
+                                   "args": {"name": track_name}})
+            for name, start_ns, end_ns, args in list(trace.spans):
+                events.append({
+                    "ph": "X", "name": name, "pid": pids[trace.monitor], "tid": TRACKS.get(name, 2),
+                    "ts": start_ns / 1000, "dur": max(end_ns - start_ns, 0) / 1000,
+                    "args": {"frame_id": trace.frame_id, "version": trace.version, **args},
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+tracer = Tracer()
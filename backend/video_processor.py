@@ -3,10 +3,11 @@ import cv2
 import numpy as np
 import time
 from datetime import datetime
+import itertools
 import os
 import threading
 import traceback
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 
 from sympy import det
 from torch import Type
@@ -14,19 +15,29 @@ from torch import Type
 from backend.camera_capture import create_camera_capture
 # 导入日志记录器
 from backend.logger import ActivityLogger
+from backend.metrics import metrics
+from backend.tracing import tracer
+from backend.profiler import ThreadProfiler
 
 class VideoProcessor:
     """视频处理类，负责从摄像头获取视频流并进行分析"""
-    @dataclass
+    @dataclass(frozen=True)
     class DetectionStatus():
+        """
+        不可变的状态快照：处理线程每次分析完整体替换 self.status（原子的引用赋值），
+        读者拿到的永远是一致的快照。version 单调递增，读者可据此判断是否需要重新序列化
+        *_time 是最近一次检测到的时间，几乎每帧都在变，不参与比较，只有标志位变化才递增 version
+        """
+        version: int = 0
+
         is_person_detected: bool = False
-        person_detected_time: int = 0
+        person_detected_time: int = field(default=0, compare=False)
 
         is_cup_detected: bool = False
-        cup_detected_time: int = 0
+        cup_detected_time: int = field(default=0, compare=False)
         
         is_active: bool = False
-        active_time: int = 0
+        active_time: int = field(default=0, compare=False)
 
     def __init__(self, video_url: str):
         """
@@ -35,12 +46,30 @@ class VideoProcessor:
         self.video_url = video_url
         # 创建摄像头实例
         self.camera = create_camera_capture(video_url)
+        self.camera.attach_metrics(video_url)
         self.camera.start(video_url)
         print(f"[VideoProcessor] 启动摄像头: {self.camera}")
 
-        self.logger = ActivityLogger()
+        self.logger = ActivityLogger(tag=video_url)
         self.status = self.DetectionStatus()
 
+        # 各阶段耗时直方图和丢弃旧帧计数
+        self.stage_histograms = {
+            stage: metrics.histogram("stage_latency_ms", monitor=video_url, stage=stage)
+            for stage in ("yolo", "face", "activity", "total")
+        }
+        self.stale_frames_counter = metrics.counter("stale_frames_dropped_total", monitor=video_url)
+        self.last_stale_frame_time_ms = None  # 同一旧帧（如摄像头离线时）只计一次
+        # 最近一次发布的状态是由哪一帧的链路追踪产生的（推送时接着记录），见 backend/tracing.py
+        self.status_trace = None
+        # 本 monitor 的采样计数器（每个 monitor 各自按 SAMPLE_EVERY 采样）和上一次分析的帧
+        self.trace_counter = itertools.count()
+        self.last_analyzed_frame_time_ms = None
+        # 按需 cProfile 处理线程，见 /admin/profile
+        self.profiler = ThreadProfiler()
+        # 有人/无人状态变化时的回调（HealthAnalyze 设置），在处理线程里调用，必须非阻塞
+        self.on_person_change = None
+
         # 帧相关变量
         self.frame_buffer = []
         self.frame_index = 0
@@ -64,6 +93,7 @@ class VideoProcessor:
         self.face_signin = FaceSignin()
         last_processing_time = 0
         while True:
+            self.profiler.step()
             current_time_ms = int(time.time_ns() / 1_000_000)
 
             # 控制处理频率
@@ -74,7 +104,7 @@ class VideoProcessor:
             last_processing_time = current_time_ms
 
             # 获取最新帧
-            frame, latest_frame_time_ms = self.camera.get_latest_frame()
+            frame, latest_frame_time_ms, capture_timing = self.camera.get_latest_frame_with_timing()
             if frame is None:
                 time.sleep(0.01)
                 continue
@@ -83,6 +113,9 @@ class VideoProcessor:
             frame_age = current_time_ms - \
                 latest_frame_time_ms if latest_frame_time_ms else float('inf')
             if frame_age > 1000:  # 超过1秒的帧丢弃
+                if latest_frame_time_ms != self.last_stale_frame_time_ms:
+                    self.last_stale_frame_time_ms = latest_frame_time_ms
+                    self.stale_frames_counter.inc()
                 continue
 
             # 更新帧缓冲区
@@ -92,14 +125,28 @@ class VideoProcessor:
 
             self.frame_index += 1
 
+            # 取帧时决定是否追踪；同一帧被分析两次时只在第一次参与采样
+            trace = None
+            if latest_frame_time_ms != self.last_analyzed_frame_time_ms:
+                self.last_analyzed_frame_time_ms = latest_frame_time_ms
+                trace = tracer.start(self.trace_counter, capture_timing)
+                if trace is not None:
+                    trace.monitor = self.camera.monitor_label
+
             # 分析当前帧
-            self._analyze_frame(frame)
+            self._analyze_frame(frame, trace)
 
-    def _analyze_frame(self, frame: np.ndarray):
+    def _analyze_frame(self, frame: np.ndarray, trace=None):
         processing_start_time = time.time()
+        if trace is not None:
+            # 从解码完成到开始分析之间的排队时间
+            trace.add("queue", trace.spans[-1][2] if trace.spans else int(processing_start_time * 1e9),
+                      int(processing_start_time * 1e9))
 
         # 创建开始时间记录 设置帧 index
         log_entry = self.logger.timing('frame_id', self.frame_index)
+        # 在当前快照的基础上计算新状态，最后一次性发布
+        status = self.status
 
         # 如果启用了YOLO处理
         if self.enable_yolo_processing:
@@ -108,12 +155,15 @@ class VideoProcessor:
                 # 使用YOLO检测器进行检测
                 self.detection_result = self.yolo_detector.detect(frame)
 
-                self._update_person_status()
-                self._update_cup_status()
+                status = self._update_person_status(status)
+                status = self._update_cup_status(status)
 
                 # 记录YOLO处理时间
-                log_entry.timing('yolo', int(
-                    (time.time() - yolo_start) * 1000))
+                yolo_ms = (time.time() - yolo_start) * 1000
+                log_entry.timing('yolo', int(yolo_ms))
+                self.stage_histograms['yolo'].observe(yolo_ms)
+                if trace is not None:
+                    trace.add('yolo', int(yolo_start * 1e9))
             except Exception as e:
                 print(f"[VideoProcessor] YOLO分析出错: {e}")
                 e.with_traceback(traceback.format_exc())
@@ -125,8 +175,11 @@ class VideoProcessor:
                 # 使用人脸签到检测器进行检测
                 self.face_signin.detect(frame)
                 # 记录人脸处理时间
-                log_entry.timing('face', int(
-                    (time.time() - face_start) * 1000))
+                face_ms = (time.time() - face_start) * 1000
+                log_entry.timing('face', int(face_ms))
+                self.stage_histograms['face'].observe(face_ms)
+                if trace is not None:
+                    trace.add('face', int(face_start * 1e9))
             except Exception as e:
                 print(f"[VideoProcessor] 人脸签到分析出错: {e}")
                 e.with_traceback(traceback.format_exc())
@@ -134,22 +187,50 @@ class VideoProcessor:
 
         # 进行活动检测
         activity_start = time.time()
-        self._update_activity_detect()
-        log_entry.timing('activity', int(
-            (time.time() - activity_start) * 1000))
+        status = self._update_activity_detect(status)
+        activity_ms = (time.time() - activity_start) * 1000
+        log_entry.timing('activity', int(activity_ms))
+        self.stage_histograms['activity'].observe(activity_ms)
+        if trace is not None:
+            trace.add('activity', int(activity_start * 1e9))
+
+        self._publish_status(status, trace)
 
         # 记录处理时间和状态
         processing_end_time = time.time()
-        log_entry.timing('total', int((processing_end_time - processing_start_time) * 1000))
+        total_ms = (processing_end_time - processing_start_time) * 1000
+        log_entry.timing('total', int(total_ms))
+        self.stage_histograms['total'].observe(total_ms)
+        if trace is not None:
+            trace.add('analysis', int(processing_start_time * 1e9), int(processing_end_time * 1e9))
+            tracer.finish(trace)
         # 记录检测状态
         log_entry.timing('status', self.status)
         # 提交日志
         log_entry.push(verbose=True)
 
-    def _update_activity_detect(self):
+    def _publish_status(self, status: DetectionStatus, trace=None):
+        """
+        发布新的状态快照。标志位有变化时版本号 +1；只有检测时间变化时照样替换快照（防抖要用），版本号不变
+        """
+        if status == self.status:
+            self.status = status
+            return
+        status = replace(status, version=self.status.version + 1)
+        if trace is not None:
+            trace.version = status.version
+            trace.add('publish', time.time_ns())
+            self.status_trace = trace
+        person_changed = status.is_person_detected != self.status.is_person_detected
+        self.status = status
+        callback = self.on_person_change
+        if person_changed and callback is not None:
+            callback()
+
+    def _update_activity_detect(self, status: DetectionStatus) -> DetectionStatus:
         """检测员工是否有活动"""
         if len(self.frame_buffer) < 2:
-            return
+            return status
 
         prev_frame = cv2.cvtColor(self.frame_buffer[-2], cv2.COLOR_BGR2GRAY)
         curr_frame = cv2.cvtColor(self.frame_buffer[-1], cv2.COLOR_BGR2GRAY)
@@ -163,51 +244,56 @@ class VideoProcessor:
         current_time_ms = int(time.time_ns() / 1_000_000)
         
         if diff_ratio > 0.4:  # 如果差异比例大于阈值，认为有活动
-            self.status.is_active = True
-            self.status.active_time = current_time_ms
+            status = replace(status, is_active=True, active_time=current_time_ms)
         else:
             # 如果已经有活动时间记录，并且间隔超过2秒，则认为静止
-            if self.status.active_time > 0:
-                inactivity_duration = (current_time_ms - self.status.active_time) / 1000
+            if status.active_time > 0:
+                inactivity_duration = (current_time_ms - status.active_time) / 1000
                 if inactivity_duration > 2:  # 2秒无活动认为静止
-                    self.status.is_active = False
+                    status = replace(status, is_active=False)
 
         # 日志记录
-        self.logger.log_activity(self.frame_index, diff_ratio, self.status.is_active)
+        self.logger.log_activity(self.frame_index, diff_ratio, status.is_active)
+        return status
 
-    def _update_person_status(self):
+    def _update_person_status(self, status: DetectionStatus) -> DetectionStatus:
         """更新人体检测状态"""
         current_time_ms = int(time.time_ns() / 1_000_000)
         
         if self.detection_result.person_detected:
-            self.status.is_person_detected = True
-            self.status.person_detected_time = current_time_ms
-        else:
-            # 如果现在没有人，但之前检测到人，检查absence时间
-            if self.status.is_person_detected and self.status.person_detected_time > 0:
-                absence_duration = (current_time_ms - self.status.person_detected_time) / 1000
-                if absence_duration > 2:  # 2秒后认为人离开
-                    self.status.is_person_detected = False
-            else:
-                self.status.is_person_detected = False
-
-    def _update_cup_status(self):
+            return replace(status, is_person_detected=True, person_detected_time=current_time_ms)
+        # 如果现在没有人，但之前检测到人，检查absence时间
+        if status.is_person_detected and status.person_detected_time > 0:
+            absence_duration = (current_time_ms - status.person_detected_time) / 1000
+            if absence_duration > 2:  # 2秒后认为人离开
+                return replace(status, is_person_detected=False)
+            return status
+        return replace(status, is_person_detected=False)
+
+    def _update_cup_status(self, status: DetectionStatus) -> DetectionStatus:
         """更新水杯检测状态"""
         current_time_ms = int(time.time_ns() / 1_000_000)
         
         if self.detection_result.cup_detected:
-            self.status.is_cup_detected = True
-            self.status.cup_detected_time = current_time_ms
-        else:
-            # 如果之前检测到水杯，检查absence时间
-            if self.status.is_cup_detected and self.status.cup_detected_time > 0:
-                no_cup_duration = (current_time_ms - self.status.cup_detected_time) / 1000
-                if no_cup_duration > 5:  # 5秒后认为没有水杯
-                    self.status.is_cup_detected = False
-            else:
-                self.status.is_cup_detected = False
+            return replace(status, is_cup_detected=True, cup_detected_time=current_time_ms)
+        # 如果之前检测到水杯，检查absence时间
+        if status.is_cup_detected and status.cup_detected_time > 0:
+            no_cup_duration = (current_time_ms - status.cup_detected_time) / 1000
+            if no_cup_duration > 5:  # 5秒后认为没有水杯
+                return replace(status, is_cup_detected=False)
+            return status
+        return replace(status, is_cup_detected=False)
 
     def get_latest_frame(self):
         """获取最新的视频帧（无检测框）"""
         frame, _ = self.camera.get_latest_frame()
         return frame
+
+    def get_latest_frame_time(self):
+        """获取最新帧的时间戳（毫秒），用于判断是否有新帧"""
+        return self.camera.latest_frame_time_ms
+
+    def get_latest_jpeg(self):
+        """获取最新帧的原始 JPEG 字节，摄像头不提供时为 None"""
+        jpeg, _ = self.camera.get_latest_jpeg()
+        return jpeg
@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import crud, get_db, session_writer, submit_background
+
+
+class WorkDurationAccumulator:
+    """
+    今日在岗时长的内存累加器，推送循环 O(1) 读取，不再每次查数据库
+    启动时和跨天时从数据库取种子，之后由工作会话开始/结束事件增量更新，并定期与数据库对账
+    口径与 crud.get_today_work_duration 一致：只统计今天开始的会话
+    """
+    RECONCILE_INTERVAL = 300  # 与数据库对账的间隔（秒）
+
+    def __init__(self, monitor_video_url: str):
+        self.monitor_video_url = monitor_video_url
+        self.lock = threading.Lock()
+        self.day_start = 0
+        self.next_day_start = 0
+        self.closed_seconds = 0  # 今天开始且已结束的会话累计秒数
+        self.open_session_start = None  # 进行中会话的开始时间
+        self.reconciled_at = 0
+        self.reconciled_day_start = 0
+        # 各 monitor 的对账时间错开，避免同时启动的 monitor 每次都一起对账
+        self.reconcile_interval = self.RECONCILE_INTERVAL + random.uniform(0, 60)
+        self.reconciling = False
+        self.reconcile()
+
+    def _roll_day(self, now: int):
+        """跨天：昨天开始的会话今天不计入（调用方持锁）"""
+        today = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.day_start = int(today.timestamp())
+        self.next_day_start = int((today + timedelta(days=1)).timestamp())
+        self.closed_seconds = 0
+
+    def _open_seconds(self, now: int) -> int:
+        if self.open_session_start is None or self.open_session_start < self.day_start:
+            return 0
+        return now - self.open_session_start
+
+    def on_session_start(self, start_time: int):
+        with self.lock:
+            self.open_session_start = start_time
+
+    def on_session_end(self, start_time: int, end_time: int):
+        with self.lock:
+            if end_time >= self.next_day_start:
+                self._roll_day(end_time)
+            if start_time >= self.day_start:
+                self.closed_seconds += end_time - start_time
+            self.open_session_start = None
+
+    def today_seconds(self) -> int:
+        """今日累计在岗秒数，包含进行中的会话（O(1)，不访问数据库）"""
+        now = int(time.time())
+        with self.lock:
+            if now >= self.next_day_start:
+                self._roll_day(now)
+            return self.closed_seconds + self._open_seconds(now)
+
+    def reconcile(self):
+        """从数据库重新取种子（启动、跨天、定期对账时调用，不要在事件循环里调用）"""
+        # 会话事件由写线程批量落库，先等队列写完再读，避免漏掉刚开始的会话
+        session_writer.flush()
+        db = next(get_db())
+        try:
+            db_seconds = crud.get_today_work_duration(db, self.monitor_video_url)
+        finally:
+            db.close()
+        now = int(time.time())
+        with self.lock:
+            self._roll_day(now)
+            # 数据库结果包含进行中的会话，扣掉内存里按实时计算的部分
+            self.closed_seconds = max(0, int(db_seconds or 0) - self._open_seconds(now))
+            self.reconciled_at = now
+            self.reconciled_day_start = self.day_start
+
+    def maybe_reconcile(self):
+        """
+        跨天或到了对账时间时对账，由调度线程每秒调用
+        对账要等写线程落库再查数据库，放到数据库线程池里执行，调用方不阻塞
+        """
+        now = int(time.time())
+        if self.reconciling:
+            return
+        if (now >= self.next_day_start or self.day_start != self.reconciled_day_start
+                or now - self.reconciled_at >= self.reconcile_interval):
+            self.reconciling = True
+            submit_background(self._reconcile_in_background)
+
+    def _reconcile_in_background(self):
+        try:
+            self.reconcile()
+        except Exception as e:
+            print(f"[WorkDuration] {self.monitor_video_url} 对账失败: {e}")
+            # 失败后等下一个间隔再试，不要每秒重试
+            self.reconciled_at = int(time.time())
+        finally:
+            self.reconciling = False
@@ -1,5 +1,8 @@
 from .models import create_tables, get_db, Base, engine
 from . import crud
+from .session_writer import session_writer
+from .timeseries import status_series
+from .async_db import run_db, submit_background
 
 # 初始化数据库
 create_tables() 
\ No newline at end of file
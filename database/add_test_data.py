@@ -1,14 +1,20 @@
+"""
+Populate working_sessions with test data, and benchmark the hot queries.
+
+Run from the project root:
+    python -m database.add_test_data                       # 7 days for two monitors
+    DATABASE_URL=sqlite:///./bench.db python -m database.add_test_data \
+        --synthetic --monitors 50 --years 3 --sessions-per-day 30 --benchmark
+"""
+import argparse
 import time
 import random
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
-# Assuming models.py and crud.py are in the same directory or accessible
-# Adjust import paths if your project structure is different.
-# If this script is inside 'database' directory, and 'models.py' is also there:
-from models import WorkingSession, get_db, create_tables
-# If 'crud.py' is needed for some helper (though direct model usage is fine here)
-# import crud
+from database.models import WorkingSession, get_db, create_tables
+from database import crud
 
 def populate_test_data(db: Session, monitor_url: str, num_days: int):
     print(f"Populating test data for monitor '{monitor_url}' for the last {num_days} days...")
@@ -59,6 +65,7 @@ def populate_test_data(db: Session, monitor_url: str, num_days: int):
                 start_time=start_time,
                 end_time=end_time,
                 duration_seconds=duration_seconds,
+                monitor_id=crud.get_monitor_id(db, monitor_url),
                 monitor_video_url=monitor_url
             )
             db.add(session)
@@ -67,27 +74,106 @@ def populate_test_data(db: Session, monitor_url: str, num_days: int):
     db.commit()
     print(f"Finished populating test data for monitor '{monitor_url}'.")
 
+def populate_synthetic_data(db: Session, num_monitors: int, num_days: int, sessions_per_day: int,
+                            batch_size: int = 50000):
+    """
+    Bulk-insert a synthetic multi-year dataset: num_monitors * num_days * sessions_per_day rows.
+    Sessions are short presence stretches spread over the working day, like the real detector produces.
+    """
+    monitor_urls = [f"udpserver://0.0.0.0:8099/10.0.{i // 256}.{i % 256}" for i in range(num_monitors)]
+    monitor_ids = {url: crud.get_monitor_id(db, url) for url in monitor_urls}
+    today_start_dt = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    total = num_monitors * num_days * sessions_per_day
+    print(f"Inserting {total} synthetic sessions ({num_monitors} monitors, {num_days} days)...")
+
+    rows = []
+    inserted = 0
+    started = time.perf_counter()
+    for day in range(num_days):
+        day_start_ts = int((today_start_dt - timedelta(days=day)).timestamp())
+        work_start_ts = day_start_ts + 8 * 3600
+        slot = 10 * 3600 // sessions_per_day  # spread over 08:00-18:00
+        for url in monitor_urls:
+            for n in range(sessions_per_day):
+                start_time = work_start_ts + n * slot + random.randint(0, slot // 4)
+                duration_seconds = random.randint(slot // 4, slot // 2)
+                rows.append({
+                    "start_time": start_time,
+                    "end_time": start_time + duration_seconds,
+                    "duration_seconds": duration_seconds,
+                    "monitor_id": monitor_ids[url],
+                    "monitor_video_url": url,
+                })
+            if len(rows) >= batch_size:
+                db.execute(insert(WorkingSession), rows)
+                db.commit()
+                inserted += len(rows)
+                rows = []
+                print(f"  {inserted}/{total} rows, {inserted / (time.perf_counter() - started):.0f} rows/s")
+    if rows:
+        db.execute(insert(WorkingSession), rows)
+        db.commit()
+    print(f"Finished inserting synthetic data in {time.perf_counter() - started:.1f}s.")
+    return monitor_urls
+
+
+def benchmark(db: Session, monitor_urls: list, rounds: int = 200):
+    """Time the two hot queries: today's duration (push loop / reconcile) and a week of history (/history)."""
+    now = int(time.time())
+    week_ago = now - 7 * 24 * 3600
+    cases = {
+        "get_today_work_duration": lambda url: crud.get_today_work_duration(db, url),
+        "get_work_sessions_for_period(7d)": lambda url: crud.get_work_sessions_for_period(db, url, week_ago, now),
+    }
+    total_rows = db.query(WorkingSession).count()
+    print(f"Benchmark on {total_rows} rows, {rounds} rounds per query:")
+    for name, query in cases.items():
+        timings = []
+        for i in range(rounds):
+            url = monitor_urls[i % len(monitor_urls)]
+            started = time.perf_counter()
+            query(url)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"  {name}: p50 {timings[len(timings) // 2] * 1000:.3f} ms, "
+              f"p99 {timings[int(len(timings) * 0.99)] * 1000:.3f} ms")
+
+
 if __name__ == "__main__":
-    # Ensure tables are created
+    parser = argparse.ArgumentParser(description="Populate test data / benchmark working_sessions queries")
+    parser.add_argument("--synthetic", action="store_true", help="bulk-insert a synthetic multi-year dataset")
+    parser.add_argument("--monitors", type=int, default=20)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--sessions-per-day", type=int, default=30)
+    parser.add_argument("--benchmark", action="store_true", help="time the history and today-duration queries")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    # Ensure tables are created (and old databases migrated)
     print("Creating database tables if they don't exist...")
     create_tables() # This function should be in models.py
 
     print("Attempting to populate test data...")
     db_session = next(get_db())
     try:
-        # Example usage:
-        mock_monitor_url_1 = "test_monitor_1_fixed_url"
-        # This URL is from the project's monitor_registry.py
-        mock_monitor_url_2 = "udpserver://0.0.0.0:8099/192.168.10.100"
-
-        populate_test_data(db_session, mock_monitor_url_1, 7)
-        populate_test_data(db_session, mock_monitor_url_2, 7)
+        if args.synthetic:
+            monitor_urls = populate_synthetic_data(db_session, args.monitors, int(args.years * 365),
+                                                   args.sessions_per_day)
+        else:
+            # Example usage:
+            mock_monitor_url_1 = "test_monitor_1_fixed_url"
+            # This URL is from the project's monitor_registry.py
+            mock_monitor_url_2 = "udpserver://0.0.0.0:8099/192.168.10.100"
+
+            populate_test_data(db_session, mock_monitor_url_1, 7)
+            populate_test_data(db_session, mock_monitor_url_2, 7)
+            monitor_urls = [mock_monitor_url_1, mock_monitor_url_2]
 
         print("Test data population successful.")
+        if args.benchmark:
+            benchmark(db_session, monitor_urls, args.rounds)
     except Exception as e:
         print(f"An error occurred during test data population: {e}")
     finally:
         db_session.close()
         print("Database session closed.")
-
-```
@@ -0,0 +1,30 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from sqlalchemy.orm import Session
+
+from .models import SessionLocal
+
+T = TypeVar("T")
+
+# 专用于 API 查询的线程池：线程数就是并发上限，多出的查询在池里排队，
+# 不占用 FastAPI/anyio 的默认线程池，也不会阻塞事件循环（视频流、WebSocket 推送照常）
+DB_CONCURRENCY = 4
+_executor = ThreadPoolExecutor(max_workers=DB_CONCURRENCY, thread_name_prefix="db-query")
+
+
+def submit_background(fn: Callable[..., T], *args) -> Future:
+    """在同一个线程池里执行不需要等待结果的后台任务（如在岗时长对账），不占用调用方线程"""
+    return _executor.submit(fn, *args)
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """在专用线程池里用独立的 Session 执行同步查询 fn(db, *args, **kwargs)"""
+    def call():
+        db: Session = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
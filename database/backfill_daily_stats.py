@@ -0,0 +1,19 @@
+"""
+从已有的 working_sessions 重建 daily_work_stats 每日汇总（升级到汇总表后执行一次）
+请在服务停止时运行，避免与写线程同时修改汇总表
+
+在项目根目录运行:
+    python -m database.backfill_daily_stats
+"""
+import time
+
+from database import get_db, crud
+
+if __name__ == "__main__":
+    db = next(get_db())
+    try:
+        started = time.perf_counter()
+        count = crud.rebuild_daily_stats(db)
+        print(f"[Backfill] 已从 {count} 个会话重建每日汇总，用时 {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
@@ -1,14 +1,60 @@
 from os import times
 from attr import has
+from sqlalchemy import event, func, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime # Removed timedelta, kept datetime
+from datetime import datetime, timedelta
 import time # Added time
 # import numpy as np # numpy seems no longer used
 from . import models
 
+# video_url -> monitors.id，id 分配后不会变，进程内缓存（只缓存已提交的）
+_monitor_ids: dict[str, int] = {}
+
+def get_monitor_id(db: Session, monitor_video_url: str, create: bool = True) -> int | None:
+    """
+    把 video_url 映射为整数 monitor_id，create 时不存在则新建
+    新建时只 flush 不提交，由调用方的事务一起提交（写线程一批一个事务）；提交后才进入进程缓存
+    """
+    monitor_id = _monitor_ids.get(monitor_video_url) or db.info.get("new_monitor_ids", {}).get(monitor_video_url)
+    if monitor_id is not None:
+        return monitor_id
+    record = db.query(models.MonitorRecord).filter(
+        models.MonitorRecord.video_url == monitor_video_url).first()
+    if record is not None:
+        # 本 session 新建的已在上面返回，查到的一定是已提交的
+        _monitor_ids[monitor_video_url] = record.id
+        return record.id
+    if not create:
+        return None
+    try:
+        # 用保存点，插入冲突时只回滚这一条，不影响同一事务里的其他写入
+        with db.begin_nested():
+            record = models.MonitorRecord(video_url=monitor_video_url)
+            db.add(record)
+    except IntegrityError:
+        # 其他线程刚好先插入了
+        record = db.query(models.MonitorRecord).filter(
+            models.MonitorRecord.video_url == monitor_video_url).first()
+        _monitor_ids[monitor_video_url] = record.id
+        return record.id
+    db.info.setdefault("new_monitor_ids", {})[monitor_video_url] = record.id
+    return record.id
+
+@event.listens_for(models.SessionLocal, "after_commit")
+def _cache_new_monitor_ids(db: Session):
+    _monitor_ids.update(db.info.pop("new_monitor_ids", {}))
+
+@event.listens_for(models.SessionLocal, "after_rollback")
+def _drop_new_monitor_ids(db: Session):
+    db.info.pop("new_monitor_ids", None)
+
 def start_working_session(db: Session, monitor_video_url: str):
     """开始一个新的工作会话"""
-    session = models.WorkingSession(start_time=int(time.time()), monitor_video_url=monitor_video_url)
+    session = models.WorkingSession(start_time=int(time.time()),
+                                    monitor_id=get_monitor_id(db, monitor_video_url),
+                                    monitor_video_url=monitor_video_url)
     db.add(session)
     db.commit()
     db.refresh(session)
@@ -33,32 +79,123 @@ def get_today_work_duration(db: Session, monitor_video_url: str) -> int:
     """
     today_start_dt = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     today_start_ts = int(today_start_dt.timestamp())
+    monitor_id = get_monitor_id(db, monitor_video_url, create=False)
+    if monitor_id is None:
+        return 0
 
-    sessions = db.query(models.WorkingSession).filter(
-        models.WorkingSession.monitor_video_url == monitor_video_url,
-        models.WorkingSession.start_time >= today_start_ts
-    ).all()
-
-    total_seconds = 0
+    # 走 (monitor_id, start_time) 索引在 SQL 里直接求和；进行中的会话按当前时间计算
     current_ts = int(time.time())
-    for s in sessions:
-        if s.end_time is not None and s.duration_seconds is not None:
-            total_seconds += s.duration_seconds
-        elif s.start_time is not None: # Session is ongoing or duration_seconds was not set for some reason
-            # If end_time is None, it's an ongoing session
-            # If end_time is not None but duration_seconds is None, calculate it now (should not happen with new logic)
-            end_or_current_time = s.end_time if s.end_time is not None else current_ts
-            total_seconds += (end_or_current_time - s.start_time)
-    return total_seconds
+    ws = models.WorkingSession
+    total_seconds = db.query(func.sum(func.coalesce(
+        ws.duration_seconds, func.coalesce(ws.end_time, current_ts) - ws.start_time
+    ))).filter(
+        ws.monitor_id == monitor_id,
+        ws.start_time >= today_start_ts
+    ).scalar()
+    return int(total_seconds or 0)
 
 def get_work_sessions_for_period(db: Session, monitor_video_url: str, start_date_ts: int, end_date_ts: int):
     """获取指定时间段内特定监控视频的工作会话记录"""
+    monitor_id = get_monitor_id(db, monitor_video_url, create=False)
+    if monitor_id is None:
+        return []
     return db.query(models.WorkingSession).filter(
-        models.WorkingSession.monitor_video_url == monitor_video_url,
+        models.WorkingSession.monitor_id == monitor_id,
         models.WorkingSession.start_time >= start_date_ts,
         models.WorkingSession.start_time <= end_date_ts
     ).order_by(models.WorkingSession.start_time).all()
 
+def get_work_sessions_page(db: Session, monitor_video_url: str, start_date_ts: int, end_date_ts: int,
+                           limit: int, after: tuple[int, int] | None = None) -> list[tuple]:
+    """
+    按 (start_time, id) 键集分页获取会话，after 为上一页最后一行的 (start_time, id)
+    返回列元组 (id, start_time, end_time, duration_seconds)，不构造 ORM 对象；每页都走复合索引，与翻到第几页无关
+    """
+    monitor_id = get_monitor_id(db, monitor_video_url, create=False)
+    if monitor_id is None:
+        return []
+    ws = models.WorkingSession
+    query = db.query(ws.id, ws.start_time, ws.end_time, ws.duration_seconds).filter(
+        ws.monitor_id == monitor_id,
+        ws.start_time >= start_date_ts,
+        ws.start_time <= end_date_ts
+    )
+    if after is not None:
+        query = query.filter(tuple_(ws.start_time, ws.id) > tuple_(*after))
+    return query.order_by(ws.start_time, ws.id).limit(limit).all()
+
+def split_by_day(start_time: int, end_time: int):
+    """把一段在岗时间按本地零点拆开，产出 (当天零点, 段开始, 段结束)"""
+    day = datetime.fromtimestamp(start_time).replace(hour=0, minute=0, second=0, microsecond=0)
+    while True:
+        day_start = int(day.timestamp())
+        day = day + timedelta(days=1)
+        next_day_start = int(day.timestamp())
+        yield day_start, max(start_time, day_start), min(end_time, next_day_start)
+        if end_time <= next_day_start:
+            return
+
+def add_session_to_daily_stats(db: Session, monitor_id: int, start_time: int, end_time: int):
+    """把一个已结束的会话累加进每日汇总（不提交，由调用方在同一事务里提交）"""
+    table = models.DailyWorkStats.__table__
+    for day_start, seg_start, seg_end in split_by_day(start_time, end_time):
+        seconds = seg_end - seg_start
+        stmt = sqlite_insert(table).values(
+            monitor_id=monitor_id, day_start=day_start, total_seconds=seconds, session_count=1,
+            first_presence=seg_start, last_presence=seg_end, longest_seconds=seconds)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.monitor_id, table.c.day_start],
+            set_={
+                "total_seconds": table.c.total_seconds + stmt.excluded.total_seconds,
+                "session_count": table.c.session_count + 1,
+                # SQLite 的多参数 min/max 是标量函数
+                "first_presence": func.min(table.c.first_presence, stmt.excluded.first_presence),
+                "last_presence": func.max(table.c.last_presence, stmt.excluded.last_presence),
+                "longest_seconds": func.max(table.c.longest_seconds, stmt.excluded.longest_seconds),
+            }))
+
+def get_daily_stats(db: Session, monitor_video_url: str, start_day_ts: int, end_day_ts: int):
+    """获取 [start_day_ts, end_day_ts] 范围内的每日汇总，按天升序"""
+    monitor_id = get_monitor_id(db, monitor_video_url, create=False)
+    if monitor_id is None:
+        return []
+    return db.query(models.DailyWorkStats).filter(
+        models.DailyWorkStats.monitor_id == monitor_id,
+        models.DailyWorkStats.day_start >= start_day_ts,
+        models.DailyWorkStats.day_start <= end_day_ts
+    ).order_by(models.DailyWorkStats.day_start).all()
+
+def rebuild_daily_stats(db: Session) -> int:
+    """从 working_sessions 全量重建每日汇总（回填旧数据用），返回处理的会话数"""
+    ws = models.WorkingSession
+    # 先在内存里按 (monitor_id, 天) 聚合，再一次性批量写入，百万级会话也只需几秒
+    stats = {}
+    count = 0
+    rows = db.query(ws.monitor_id, ws.start_time, ws.end_time).filter(
+        ws.monitor_id.isnot(None), ws.end_time.isnot(None)
+    ).execution_options(yield_per=10000)
+    for monitor_id, start_time, end_time in rows:
+        for day_start, seg_start, seg_end in split_by_day(start_time, end_time):
+            seconds = seg_end - seg_start
+            day = stats.get((monitor_id, day_start))
+            if day is None:
+                stats[(monitor_id, day_start)] = {
+                    "monitor_id": monitor_id, "day_start": day_start, "total_seconds": seconds,
+                    "session_count": 1, "first_presence": seg_start, "last_presence": seg_end,
+                    "longest_seconds": seconds}
+            else:
+                day["total_seconds"] += seconds
+                day["session_count"] += 1
+                day["first_presence"] = min(day["first_presence"], seg_start)
+                day["last_presence"] = max(day["last_presence"], seg_end)
+                day["longest_seconds"] = max(day["longest_seconds"], seconds)
+        count += 1
+    db.query(models.DailyWorkStats).delete()
+    if stats:
+        db.execute(models.DailyWorkStats.__table__.insert(), list(stats.values()))
+    db.commit()
+    return count
+
 def create_signin_record(db: Session, name: str, has_work_label: bool, image_path: str, timestamp: int):
     """新增刷脸签到记录"""
     record = models.SigninRecord(name=name,
@@ -70,6 +207,16 @@ def create_signin_record(db: Session, name: str, has_work_label: bool, image_pat
     db.refresh(record)
     return record
 
+def delete_signin_records_by_images(db: Session, image_paths: list[str], chunk_size: int = 500) -> int:
+    """删除引用了这些图片的签到记录（图片按保留期清理后调用），返回删除的行数
+    分块删除，积压很多天的清理也不会超过 SQLite 的绑定参数上限"""
+    deleted = 0
+    for i in range(0, len(image_paths), chunk_size):
+        deleted += db.query(models.SigninRecord).filter(
+            models.SigninRecord.image_path.in_(image_paths[i:i + chunk_size])).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
 def get_signin_records(db: Session, limit: int = 100):
     """获取最近的刷脸签到记录"""
     return db.query(models.SigninRecord).order_by(models.SigninRecord.timestamp.desc()).limit(limit).all() 
\ No newline at end of file
@@ -1,16 +1,41 @@
 import time
-from sqlalchemy import Column, Integer, String, Boolean, create_engine
+from sqlalchemy import Column, Integer, String, Boolean, LargeBinary, ForeignKey, Index, create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import os
 
 # 创建数据库连接
-DATABASE_URL = "sqlite:///./health_monitoring.db"
-engine = create_engine(DATABASE_URL)
+# 可用环境变量指向其他数据库（如 add_test_data.py 的基准测试库）
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./health_monitoring.db")
+# 连接池：每个 monitor 的分析线程 + 写线程 + 并发的 HTTP 请求
+engine = create_engine(DATABASE_URL, pool_size=8, max_overflow=16, pool_timeout=10,
+                       connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
+
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        """
+        WAL：读不会被写阻塞，写只追加日志；synchronous=NORMAL 在 WAL 下断电最多丢最后几个事务，不会损坏
+        cache_size 为负数表示 KiB；busy_timeout 让偶发的写冲突等待而不是直接报 database is locked
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-16000")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+class MonitorRecord(Base):
+    """监视终端表，video_url 对应一个整数 id，会话表按 id 关联"""
+    __tablename__ = "monitors"
+
+    id = Column(Integer, primary_key=True)
+    video_url = Column(String, nullable=False, unique=True)
+
 class WorkingSession(Base):
     """工作会话记录表，记录每次工作的开始和结束时间"""
     __tablename__ = "working_sessions"
@@ -18,9 +43,59 @@ class WorkingSession(Base):
     id = Column(Integer, primary_key=True, index=True)
     start_time = Column(Integer)  # Store as Unix timestamp
     end_time = Column(Integer, nullable=True)  # Store as Unix timestamp
-    monitor_video_url = Column(String, nullable=False)
+    monitor_id = Column(Integer, ForeignKey("monitors.id"), nullable=True)
+    monitor_video_url = Column(String, nullable=False)  # 冗余保留，兼容旧数据和接口输出
     duration_seconds = Column(Integer, nullable=True)
 
+    # 所有查询都是 "某个 monitor + start_time 范围"
+    __table_args__ = (Index("ix_working_sessions_monitor_start", "monitor_id", "start_time"),)
+
+class DailyWorkStats(Base):
+    """每个 monitor 每天的工作会话汇总，会话结束时增量更新（跨零点的会话按天拆开）"""
+    __tablename__ = "daily_work_stats"
+
+    monitor_id = Column(Integer, ForeignKey("monitors.id"), primary_key=True)
+    day_start = Column(Integer, primary_key=True)  # 当天本地零点的 Unix 时间戳
+    total_seconds = Column(Integer, nullable=False, default=0)
+    session_count = Column(Integer, nullable=False, default=0)
+    first_presence = Column(Integer, nullable=True)  # 当天最早在岗时间
+    last_presence = Column(Integer, nullable=True)  # 当天最晚在岗时间
+    longest_seconds = Column(Integer, nullable=False, default=0)  # 当天最长一次连续在岗
+
+class StatusSecondBlock(Base):
+    """
+    每秒状态采样，每个 monitor 每分钟一行：flags/power 各 60 个槽位
+    flags 每秒 1 字节（位定义见 database/timeseries.py），power 每秒 u16 小端、单位 0.1W
+    """
+    __tablename__ = "status_seconds"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    monitor_id = Column(Integer, ForeignKey("monitors.id"), primary_key=True)
+    minute_start = Column(Integer, primary_key=True)
+    flags = Column(LargeBinary, nullable=False)
+    power = Column(LargeBinary, nullable=False)
+
+class _StatusRollup:
+    """降采样后的状态统计，存累加值，平均值在查询时计算，便于逐级累加"""
+    monitor_id = Column(Integer, primary_key=True)
+    ts = Column(Integer, primary_key=True)  # 分钟/小时起点
+    samples = Column(Integer, nullable=False)  # 有采样的秒数
+    person_seconds = Column(Integer, nullable=False)
+    active_seconds = Column(Integer, nullable=False)
+    cup_seconds = Column(Integer, nullable=False)
+    power_samples = Column(Integer, nullable=False)
+    power_sum = Column(Integer, nullable=False)  # 单位 0.1W
+
+class StatusMinute(_StatusRollup, Base):
+    """每分钟状态统计"""
+    __tablename__ = "status_minutes"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+class StatusHour(_StatusRollup, Base):
+    """每小时状态统计"""
+    __tablename__ = "status_hours"
+    __table_args__ = {"sqlite_with_rowid": False}
+
 class SigninRecord(Base):
     """刷脸签到记录表"""
     __tablename__ = "signin_records"
@@ -29,11 +104,34 @@ class SigninRecord(Base):
     timestamp = Column(Integer, default=int(time.time()))
     name = Column(String, nullable=False)  # 识别到的姓名
     has_work_label = Column(Boolean, default=False)  # 是否有带工牌
-    image_path = Column(String, nullable=False)  # 签到图片，格式为 "signin_{timestamp}.jpg"，使用时需要拼接 SIGNIN_IMAGES_PATH
+    image_path = Column(String, nullable=False)  # 签到图片，格式为 "{sha256}.jpg"（旧数据为 "signin_{timestamp}.jpg"），使用时需要拼接 SIGNIN_IMAGES_PATH
     
 # 创建数据库表
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    migrate_monitor_ids()
+
+def migrate_monitor_ids():
+    """
+    迁移旧数据库：给 working_sessions 加 monitor_id 列，按 monitor_video_url 回填，并建立复合索引
+    create_all 不会给已存在的表加列和索引，所以这里手动处理；已迁移过的库直接跳过
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("working_sessions")}
+    with engine.begin() as conn:
+        if "monitor_id" not in columns:
+            print("[Database] 迁移 working_sessions: 添加 monitor_id 列")
+            conn.execute(text("ALTER TABLE working_sessions ADD COLUMN monitor_id INTEGER REFERENCES monitors(id)"))
+        # 回填尚未关联的旧会话（新库里没有这样的行，很快）
+        conn.execute(text(
+            "INSERT OR IGNORE INTO monitors (video_url) "
+            "SELECT DISTINCT monitor_video_url FROM working_sessions WHERE monitor_id IS NULL"))
+        conn.execute(text(
+            "UPDATE working_sessions SET monitor_id = "
+            "(SELECT id FROM monitors WHERE monitors.video_url = working_sessions.monitor_video_url) "
+            "WHERE monitor_id IS NULL"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_working_sessions_monitor_start "
+            "ON working_sessions (monitor_id, start_time)"))
 
 # 获取数据库会话
 def get_db():
@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Optional
+
+from . import crud, models
+
+
+@dataclass
+class PendingSession:
+    """写线程里的一个工作会话，id 在写入数据库后才有"""
+    monitor_video_url: str
+    start_time: int
+    end_time: Optional[int] = None
+    id: Optional[int] = None
+
+
+class SessionWriter:
+    """
+    唯一的写线程：所有 monitor 的会话开始/结束事件进队列，攒一批后在一个事务里提交
+    调用方不等待数据库（时间戳在入队时就确定了），monitor 再多也只有一个写连接、每批一次提交
+    其他批量写入（如状态时序）通过 submit 提交带 write(db) 方法的对象，同样合并进批次
+    """
+    BATCH_INTERVAL = 0.5  # 攒批窗口（秒），从一批的第一条事件算起
+    MAX_BATCH = 500
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.events = 0
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._write_loop, daemon=True)
+                self.thread.start()
+
+    def start_session(self, monitor_video_url: str, start_time: int) -> PendingSession:
+        """记录会话开始，立即返回"""
+        self._ensure_started()
+        session = PendingSession(monitor_video_url=monitor_video_url, start_time=start_time)
+        self.queue.put(("start", session))
+        return session
+
+    def end_session(self, session: PendingSession, end_time: int):
+        """记录会话结束，立即返回（事件按顺序写入，此时开始事件一定已在同批或更早的批次中）"""
+        self._ensure_started()
+        session.end_time = end_time
+        self.queue.put(("end", session))
+
+    def submit(self, task):
+        """提交一个写任务，task.write(db) 会在写线程的批事务里执行"""
+        self._ensure_started()
+        self.queue.put(("task", task))
+
+    def flush(self):
+        """等待已入队的事件全部写入（停止服务时调用）"""
+        if self.thread is not None:
+            self.queue.join()
+
+    def _write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            # 第一条到达后最多再等 BATCH_INTERVAL，把同一时段的事件合并到一个事务
+            deadline = time.monotonic() + self.BATCH_INTERVAL
+            try:
+                while len(batch) < self.MAX_BATCH:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                pass
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"[SessionWriter] 批量写入 {len(batch)} 条事件失败，逐条重试: {e}")
+                traceback.print_exc()
+                self._write_one_by_one(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write_one_by_one(self, batch: list):
+        """整批回滚后逐条写入，一条失败不影响其他事件；失败的会话事件打印出来，不静默丢弃"""
+        for kind, item in batch:
+            if kind == "start":
+                # 整批回滚了，flush 时拿到的 id 已经无效
+                item.id = None
+        for event in batch:
+            try:
+                self._write_batch([event])
+            except Exception as e:
+                kind, item = event
+                if kind == "task":
+                    print(f"[SessionWriter] 丢弃写任务 {type(item).__name__}: {e}")
+                else:
+                    print(f"[SessionWriter] 会话事件 {kind} 写入失败，已丢弃: {item} ({e})")
+
+    def _write_batch(self, batch: list):
+        db = models.SessionLocal()
+        try:
+            for kind, item in batch:
+                if kind == "task":
+                    item.write(db)
+                    continue
+                session = item
+                if kind == "start":
+                    row = models.WorkingSession(start_time=session.start_time,
+                                                monitor_id=crud.get_monitor_id(db, session.monitor_video_url),
+                                                monitor_video_url=session.monitor_video_url)
+                    db.add(row)
+                    db.flush()  # 取得自增 id
+                    session.id = row.id
+                elif session.id is None:
+                    # 开始事件没写进去（见 _write_one_by_one），直接补写一条完整的会话
+                    row = models.WorkingSession(start_time=session.start_time, end_time=session.end_time,
+                                                duration_seconds=session.end_time - session.start_time,
+                                                monitor_id=crud.get_monitor_id(db, session.monitor_video_url),
+                                                monitor_video_url=session.monitor_video_url)
+                    db.add(row)
+                    db.flush()
+                    session.id = row.id
+                    crud.add_session_to_daily_stats(db, row.monitor_id, session.start_time, session.end_time)
+                else:
+                    updated = db.query(models.WorkingSession).filter(
+                        models.WorkingSession.id == session.id,
+                        models.WorkingSession.end_time.is_(None)
+                    ).update({
+                        models.WorkingSession.end_time: session.end_time,
+                        models.WorkingSession.duration_seconds: session.end_time - session.start_time,
+                    }, synchronize_session=False)
+                    # 会话结束时同一事务里更新每日汇总
+                    if updated:
+                        crud.add_session_to_daily_stats(db, crud.get_monitor_id(db, session.monitor_video_url),
+                                                        session.start_time, session.end_time)
+            db.commit()
+            self.batches += 1
+            self.events += len(batch)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+session_writer = SessionWriter()
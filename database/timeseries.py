@@ -0,0 +1,210 @@
+"""
+每秒检测状态的时序存储（人/活跃/水杯 + 功率）
+
+- 每个 monitor 在内存里攒当前一分钟，满一分钟封块，交给唯一的写线程批量落库
+- status_seconds: 每分钟一行，每秒 1 字节标志位 + u16 功率(0.1W)，保留 7 天
+- status_minutes / status_hours: 封块时同一事务里降采样累加，分别保留 90 天 / 3 年
+- 查询按时间跨度自动选分辨率，几个月的范围只读几千行小时数据
+"""
+import struct
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import crud, models
+from .session_writer import session_writer
+
+FLAG_SAMPLED = 1 << 0
+FLAG_PERSON = 1 << 1
+FLAG_ACTIVE = 1 << 2
+FLAG_CUP = 1 << 3
+FLAG_HAS_POWER = 1 << 4
+
+POWER = struct.Struct("<60H")
+
+# 分辨率 -> (表, 步长秒数, 保留秒数)
+RESOLUTIONS = {
+    "second": (models.StatusSecondBlock, 1, 7 * 24 * 3600),
+    "minute": (models.StatusMinute, 60, 90 * 24 * 3600),
+    "hour": (models.StatusHour, 3600, 3 * 365 * 24 * 3600),
+}
+PRUNE_INTERVAL = 3600
+
+
+class MinuteBlock:
+    """一个 monitor 一分钟的采样，封块后由写线程调用 write"""
+
+    def __init__(self, monitor_video_url: str, minute_start: int):
+        self.monitor_video_url = monitor_video_url
+        self.minute_start = minute_start
+        self.flags = bytearray(60)
+        self.power = [0] * 60
+
+    def set(self, ts: int, is_person: bool, is_active: bool, is_cup: bool, power: Optional[float]):
+        flags = FLAG_SAMPLED
+        if is_person:
+            flags |= FLAG_PERSON
+        if is_active:
+            flags |= FLAG_ACTIVE
+        if is_cup:
+            flags |= FLAG_CUP
+        if power is not None:
+            flags |= FLAG_HAS_POWER
+            self.power[ts - self.minute_start] = min(max(int(power * 10), 0), 0xFFFF)
+        self.flags[ts - self.minute_start] = flags
+
+    def write(self, db: Session):
+        """
+        同一分钟可能写两次（monitor 停止时 flush 未满的块，同一分钟内又重启）：
+        秒级块与已有行合并，分钟表和小时表只累加合并前后的差值，三张表始终一致
+        """
+        monitor_id = crud.get_monitor_id(db, self.monitor_video_url)
+        existing = db.get(models.StatusSecondBlock, (monitor_id, self.minute_start))
+        if existing is None:
+            flags, power = bytes(self.flags), self.power
+            before = rollup(bytes(60), [0] * 60)
+            db.add(models.StatusSecondBlock(monitor_id=monitor_id, minute_start=self.minute_start,
+                                            flags=flags, power=POWER.pack(*power)))
+        else:
+            old_power = POWER.unpack(existing.power)
+            # 新块里有采样的秒覆盖功率，标志位按位或
+            flags = bytes(old | new for old, new in zip(existing.flags, self.flags))
+            power = [new_power if new & FLAG_HAS_POWER else old
+                     for new, new_power, old in zip(self.flags, self.power, old_power)]
+            before = rollup(existing.flags, old_power)
+            existing.flags, existing.power = flags, POWER.pack(*power)
+        # 同一批里可能还有同一分钟的块，先 flush 让下一次 db.get 能查到
+        db.flush()
+
+        after = rollup(flags, power)
+        delta = {name: after[name] - before[name] for name in after}
+        for model, ts in ((models.StatusMinute, self.minute_start),
+                          (models.StatusHour, self.minute_start - self.minute_start % 3600)):
+            table = model.__table__
+            stmt = sqlite_insert(table).values(monitor_id=monitor_id, ts=ts, **delta)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.monitor_id, table.c.ts],
+                set_={name: table.c[name] + stmt.excluded[name] for name in delta}))
+
+
+def rollup(flags: bytes, power) -> dict:
+    """降采样：一分钟的累加值"""
+    power_values = [p for f, p in zip(flags, power) if f & FLAG_HAS_POWER]
+    return {
+        "samples": sum(1 for f in flags if f & FLAG_SAMPLED),
+        "person_seconds": sum(1 for f in flags if f & FLAG_PERSON),
+        "active_seconds": sum(1 for f in flags if f & FLAG_ACTIVE),
+        "cup_seconds": sum(1 for f in flags if f & FLAG_CUP),
+        "power_samples": len(power_values),
+        "power_sum": sum(power_values),
+    }
+
+
+class PruneTask:
+    """按保留策略删除过期数据，由写线程执行"""
+
+    def __init__(self, now: int):
+        self.now = now
+
+    def write(self, db: Session):
+        for model, step, retention in RESOLUTIONS.values():
+            column = model.minute_start if model is models.StatusSecondBlock else model.ts
+            db.query(model).filter(column < self.now - retention).delete(synchronize_session=False)
+
+
+class StatusSeries:
+    """所有 monitor 的当前分钟缓冲，由各 monitor 的分析循环每秒调用 append"""
+
+    def __init__(self):
+        self.blocks: dict[str, MinuteBlock] = {}
+        self.lock = threading.Lock()
+        self.last_prune = 0
+
+    def append(self, monitor_video_url: str, ts: int, is_person: bool, is_active: bool, is_cup: bool,
+               power: Optional[float] = None):
+        minute_start = ts - ts % 60
+        with self.lock:
+            block = self.blocks.get(monitor_video_url)
+            if block is None or block.minute_start != minute_start:
+                if block is not None:
+                    session_writer.submit(block)
+                block = self.blocks[monitor_video_url] = MinuteBlock(monitor_video_url, minute_start)
+            block.set(ts, is_person, is_active, is_cup, power)
+            if ts - self.last_prune >= PRUNE_INTERVAL:
+                self.last_prune = ts
+                session_writer.submit(PruneTask(ts))
+
+    def flush(self, monitor_video_url: str):
+        """把未满一分钟的缓冲也写入（monitor 停止时调用）"""
+        with self.lock:
+            block = self.blocks.pop(monitor_video_url, None)
+        if block is not None:
+            session_writer.submit(block)
+
+
+def pick_resolution(start_ts: int, end_ts: int, now: Optional[int] = None) -> str:
+    """按跨度和保留期选择分辨率：2 小时内按秒，7 天内按分钟，再长按小时"""
+    now = now or int(time.time())
+    span = end_ts - start_ts
+    for name, limit in (("second", 2 * 3600), ("minute", 7 * 24 * 3600)):
+        if span <= limit and start_ts >= now - RESOLUTIONS[name][2]:
+            return name
+    return "hour"
+
+
+def get_status_series(db: Session, monitor_video_url: str, start_ts: int, end_ts: int,
+                      resolution: Optional[str] = None) -> list[dict]:
+    """
+    查询 [start_ts, end_ts) 的状态序列，每个点是该时间桶的累加值
+    (samples/person_seconds/active_seconds/cup_seconds) 和平均功率 power(W)
+    """
+    resolution = resolution or pick_resolution(start_ts, end_ts)
+    monitor_id = crud.get_monitor_id(db, monitor_video_url, create=False)
+    if monitor_id is None:
+        return []
+
+    if resolution == "second":
+        model = models.StatusSecondBlock
+        rows = db.query(model).filter(
+            model.monitor_id == monitor_id,
+            model.minute_start >= start_ts - start_ts % 60,
+            model.minute_start < end_ts
+        ).order_by(model.minute_start).all()
+        points = []
+        for row in rows:
+            power = POWER.unpack(row.power)
+            for i, flags in enumerate(row.flags):
+                ts = row.minute_start + i
+                if not flags & FLAG_SAMPLED or not start_ts <= ts < end_ts:
+                    continue
+                points.append({
+                    "ts": ts, "samples": 1,
+                    "person_seconds": int(bool(flags & FLAG_PERSON)),
+                    "active_seconds": int(bool(flags & FLAG_ACTIVE)),
+                    "cup_seconds": int(bool(flags & FLAG_CUP)),
+                    "power": power[i] / 10 if flags & FLAG_HAS_POWER else None,
+                })
+        return points
+
+    model, step, _ = RESOLUTIONS[resolution]
+    # 只取列元组，不构造 ORM 对象，几千行也在毫秒级
+    rows = db.query(model.ts, model.samples, model.person_seconds, model.active_seconds, model.cup_seconds,
+                    model.power_samples, model.power_sum).filter(
+        model.monitor_id == monitor_id,
+        model.ts >= start_ts - start_ts % step,
+        model.ts < end_ts
+    ).order_by(model.ts).all()
+    return [{
+        "ts": ts,
+        "samples": samples,
+        "person_seconds": person_seconds,
+        "active_seconds": active_seconds,
+        "cup_seconds": cup_seconds,
+        "power": round(power_sum / power_samples / 10, 2) if power_samples else None,
+    } for ts, samples, person_seconds, active_seconds, cup_seconds, power_samples, power_sum in rows]
+
+
+status_series = StatusSeries()
@@ -16,26 +16,28 @@ void interactive_init()
     pixels.show();
 }
 
-void interactive_update(JsonDocument &doc)
+static void update_person_detected(bool person_detected)
 {
-    if (doc["person_detected"].is<bool>())
+    Serial.printf("[wsclient] Person detected: %s\n", person_detected ? "true" : "false");
+    if (person_detected)
     {
-        Serial.printf("[wsclient] Person detected: %s\n", doc["person_detected"] ? "true" : "false");
-        if (doc["person_detected"] == true)
-        {
-            pixels.setBrightness(100);
-            pixels.setPixelColor(0, pixels.Color(255, 255, millis() % 256)); // 颜色变化
-            lcd_update_person_detected(true);
-        }
-        else
-        {
-            pixels.setPixelColor(0, pixels.Color(0, 0, 0)); // 关闭 LED
-            lcd_update_person_detected(false);
-        }
+        pixels.setBrightness(100);
+        pixels.setPixelColor(0, pixels.Color(255, 255, millis() % 256)); // 颜色变化
+        lcd_update_person_detected(true);
     }
     else
     {
-        pixels.setPixelColor(0, pixels.Color(255, 0, 0));
+        pixels.setPixelColor(0, pixels.Color(0, 0, 0)); // 关闭 LED
+        lcd_update_person_detected(false);
+    }
+}
+
+void interactive_update(JsonDocument &doc)
+{
+    // 服务端推送增量 (type=delta) 和心跳，只更新消息里带了的字段
+    if (doc["person_detected"].is<bool>())
+    {
+        update_person_detected(doc["person_detected"] == true);
     }
 
     if (doc["generator_summary_health_message"].is<const char *>())
@@ -48,17 +50,72 @@ void interactive_update(JsonDocument &doc)
     {
         lcd_update_work_time(doc["today_work_duration_message"].as<const char *>());
     }
-    else
-    {
-        lcd_update_work_time("--");
-    }
     if (doc["water_intake_message"].is<const char *>())
     {
         lcd_update_cup_detect(doc["water_intake_message"].as<const char *>());
     }
-    else
+    pixels.show();
+}
+
+// 二进制状态帧，与 backend/status_codec.py 保持一致
+#define MSG_TYPE_STATUS 1
+#define FLAG_PERSON (1 << 1)
+#define WORK_ERROR 3
+
+// 消息 id 对应的文字表，与 backend/status_codec.py 的 MESSAGES["zh"] 一致，只能追加
+static const char *WORK_MESSAGES[] = {"暂无工作记录", "请继续保持！", "已工作较长时间!", "获取工作时长信息时出错。"};
+static const char *WATER_MESSAGES[] = {"未检测到水杯，请注意补水！", "检测到水杯，请及时喝水！"};
+
+#pragma pack(push, 1)
+struct BinaryStatus
+{
+    uint8_t type;
+    uint8_t flags;
+    uint32_t timestamp;
+    uint32_t today_work_seconds;
+    uint16_t power_deciwatts;
+    uint8_t work_message_id;
+    uint8_t water_message_id;
+    uint16_t summary_len; // 之后跟 UTF-8 AI 摘要，只在变化时携带
+};
+#pragma pack(pop)
+
+void interactive_update_binary(const uint8_t *payload, size_t length)
+{
+    // 心跳帧或不完整的帧直接忽略
+    if (length < sizeof(BinaryStatus) || payload[0] != MSG_TYPE_STATUS)
+        return;
+    BinaryStatus status;
+    memcpy(&status, payload, sizeof(status)); // ESP32 为小端，与服务端一致
+
+    update_person_detected(status.flags & FLAG_PERSON);
+
+    if (status.work_message_id < sizeof(WORK_MESSAGES) / sizeof(WORK_MESSAGES[0]))
+    {
+        char work_text[96];
+        if (status.work_message_id == WORK_ERROR)
+        {
+            snprintf(work_text, sizeof(work_text), "%s", WORK_MESSAGES[WORK_ERROR]);
+        }
+        else
+        {
+            uint32_t seconds = status.today_work_seconds;
+            snprintf(work_text, sizeof(work_text), "%lu:%02lu:%02lu\n%s",
+                     (unsigned long)(seconds / 3600), (unsigned long)(seconds / 60 % 60),
+                     (unsigned long)(seconds % 60), WORK_MESSAGES[status.work_message_id]);
+        }
+        lcd_update_work_time(work_text);
+    }
+
+    if (status.water_message_id < sizeof(WATER_MESSAGES) / sizeof(WATER_MESSAGES[0]))
+    {
+        lcd_update_cup_detect(WATER_MESSAGES[status.water_message_id]);
+    }
+
+    if (status.summary_len > 0 && length >= sizeof(BinaryStatus) + status.summary_len)
     {
-        lcd_update_cup_detect("未检测到水杯");
+        String summary((const char *)payload + sizeof(BinaryStatus), status.summary_len);
+        lcd_update_ai_summary(summary.c_str());
     }
     pixels.show();
 }
@@ -3,4 +3,5 @@
 
 void interactive_init();
 void interactive_update(JsonDocument &doc);
+void interactive_update_binary(const uint8_t *payload, size_t length);
 void interactive_push_ai_summary_refresh();
@@ -84,6 +84,8 @@ void setup()
     deserializeJson(doc, message);
     interactive_update(doc);
   });
+  wsclient_on_binary([](const uint8_t *payload, size_t length)
+                     { interactive_update_binary(payload, length); });
 
   // 核心分配策略：
   // Core 1: 系统任务 + UDP图传
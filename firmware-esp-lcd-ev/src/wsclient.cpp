@@ -3,10 +3,12 @@
 
 #define WS_SERVER_HOST "192.168.10.102"
 #define WS_SERVER_PORT 8000
-#define WS_SERVER_PATH "/monitor/MY/ws"
+// encoding=binary: 定长二进制状态帧，文字在本地按消息 id 渲染（见 interactive.cpp）
+#define WS_SERVER_PATH "/monitor/MY/ws?encoding=binary"
 
 WebSocketsClient ws;
 void (*onMessageCallback)(const String &message) = nullptr;
+void (*onBinaryCallback)(const uint8_t *payload, size_t length) = nullptr;
 String fragmentBuffer = ""; // 用于存储分片消息
 
 void wsclient_init()
@@ -31,6 +33,9 @@ void wsclient_init()
             }
             break;
         case WStype_BIN:
+            if (onBinaryCallback) {
+                onBinaryCallback(payload, length);
+            }
             break;
         case WStype_FRAGMENT_TEXT_START:
             fragmentBuffer = String((char *)payload); // 开始收集分片消息
@@ -68,3 +73,7 @@ void wsclient_on_message(void (*callback)(const String &message))
 {
     onMessageCallback = callback;
 }
+void wsclient_on_binary(void (*callback)(const uint8_t *payload, size_t length))
+{
+    onBinaryCallback = callback;
+}
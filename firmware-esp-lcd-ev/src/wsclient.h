@@ -3,8 +3,10 @@
 
 extern WebSocketsClient ws;
 extern void (*onMessageCallback)(const String &message);
+extern void (*onBinaryCallback)(const uint8_t *payload, size_t length);
 
 void wsclient_init();
 void wsclient_update();
 void wsclient_send_message(const String &message);
 void wsclient_on_message(void (*callback)(const String &message));
+void wsclient_on_binary(void (*callback)(const uint8_t *payload, size_t length));
@@ -28,13 +28,22 @@ export const getMonitorList = async () => {
   }
 }
 
-// 健康指标历史数据API
-export function getHealthMetrics(days = 7) {
-  return apiClient.get(`/health_metrics?days=${days}`)
+// 一次获取所有摄像头的当前状态（服务端带 ETag，浏览器缓存会自动用 If-None-Match 复验）
+export const getAllMonitorStatus = async () => {
+  const response = await apiClient.get('/monitor/status')
+  return response.data
 }
 
-// Add this function to the file
-export const getWorkSessionHistory = async (monitorUrl, startDateTs, endDateTs) => {
+// 每日在岗汇总（服务端按天汇总好，数据量只与天数有关）
+export const getHealthMetrics = async (monitorUrl, days = 7) => {
+  const response = await apiClient.get(`/monitor/${encodeMonitorUrl(monitorUrl)}/health_metrics`, {
+    params: { days }
+  })
+  return response.data
+}
+
+// 分页获取工作会话，返回 { sessions, next_cursor }，next_cursor 为 null 时已取完
+export const getWorkSessionHistory = async (monitorUrl, startDateTs, endDateTs, cursor = null) => {
   if (!monitorUrl) {
     throw new Error('monitorUrl is required');
   }
@@ -43,6 +52,7 @@ export const getWorkSessionHistory = async (monitorUrl, startDateTs, endDateTs)
       params: {
         start_date_ts: startDateTs,
         end_date_ts: endDateTs,
+        cursor: cursor || undefined,
       },
     });
     return response.data;
@@ -52,6 +62,25 @@ export const getWorkSessionHistory = async (monitorUrl, startDateTs, endDateTs)
   }
 };
 
+// 每秒检测状态的时序（服务端按 second/minute/hour 汇总好的桶），每个点含 person_seconds 等累加值
+export const getStatusSeries = async (monitorUrl, startTs, endTs, resolution = null) => {
+  const response = await apiClient.get(`/monitor/${encodeMonitorUrl(monitorUrl)}/series`, {
+    params: { start_ts: startTs, end_ts: endTs, resolution: resolution || undefined }
+  })
+  return response.data
+}
+
+// 导出工作会话的下载地址（服务端流式生成，format: ndjson / csv / parquet）
+export const getHistoryExportUrl = (monitorUrl, startDateTs, endDateTs, format = 'csv') => {
+  return `${API_BASE_URL}/monitor/${encodeMonitorUrl(monitorUrl)}/history/export?start_date_ts=${startDateTs}&end_date_ts=${endDateTs}&format=${format}`
+}
+
+// 获取当前检测框（原始视频流模式下由前端叠加绘制）
+export const getDetectionBoxes = async (monitorUrl) => {
+  const response = await apiClient.get(`/monitor/${encodeMonitorUrl(monitorUrl)}/boxes`)
+  return response.data
+}
+
 export const faceSignin = async(monitorUrl) => {
   if (!monitorUrl) {
     console.error('monitorUrl is required for face signin')
@@ -60,6 +89,22 @@ export const faceSignin = async(monitorUrl) => {
   return apiClient.post(`/monitor/${encodeMonitorUrl(monitorUrl)}/face_signin`);
 }
 
+// 最近的签到记录（图片地址转为完整 URL）
+export const getSigninRecords = async (limit = 20) => {
+  const response = await apiClient.get('/monitor/signin_records', { params: { limit } })
+  return response.data.map(record => ({
+    ...record,
+    image_url: `${API_BASE_URL}${record.image_url}`,
+    thumbnail_url: `${API_BASE_URL}${record.thumbnail_url}`,
+  }))
+}
+
+// 各摄像头的性能指标分位数（p50/p95/p99），按 monitor 分组
+export const getMetricsSummary = async () => {
+  const response = await apiClient.get('/metrics/summary')
+  return response.data
+}
+
 // 连接指定摄像头的WebSocket
 export const connectWebSocket = (onMessage, video_url) => {
   if (!video_url) {
@@ -71,6 +116,8 @@ export const connectWebSocket = (onMessage, video_url) => {
   
   ws.onopen = () => {
     console.log('WebSocket连接已建立')
+    // 服务端推送增量，连接后请求一次完整快照
+    ws.send(JSON.stringify({ action: 'snapshot' }))
   }
   
   ws.onmessage = (event) => {
@@ -0,0 +1,114 @@
+"""
+历史查询压测：观察数据库查询并发时 MJPEG 视频流的帧间隔是否平稳
+
+先只拉视频流测基线，再同时用多个线程不停请求 /history 和 /health_metrics，
+对比两个阶段的帧间隔分布。只用标准库，对已运行的服务端发请求。
+
+用法:
+    python history_loadtest.py --base http://localhost:8000 --monitor 192.168.10.100 \\
+        --concurrency 16 --days 365 --seconds 20
+"""
+import argparse
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+class FrameWatcher(threading.Thread):
+    """读取 MJPEG 流，记录每帧到达时间"""
+
+    def __init__(self, url: str):
+        super().__init__(daemon=True)
+        self.url = url
+        self.arrivals: list[float] = []
+
+    def run(self):
+        with urllib.request.urlopen(self.url) as response:
+            while True:
+                line = response.readline()
+                if not line:
+                    return
+                if line.startswith(b"--frame"):
+                    self.arrivals.append(time.perf_counter())
+
+    def intervals(self, start: float, end: float) -> list[float]:
+        arrivals = [t for t in self.arrivals if start <= t < end]
+        return [b - a for a, b in zip(arrivals, arrivals[1:])]
+
+
+def query_worker(urls: list[str], stop: threading.Event, latencies: list, errors: list):
+    i = 0
+    while not stop.is_set():
+        url = urls[i % len(urls)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url) as response:
+                response.read()
+            latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(e)
+
+
+def report(name: str, intervals: list[float]):
+    print(f"  {name}: {len(intervals) + 1} 帧, 帧间隔 p50 {percentile(intervals, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(intervals, 0.95) * 1000:.1f} ms, 最大 {max(intervals, default=0) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史查询并发时的视频流帧间隔压测")
+    parser.add_argument("--base", default="http://localhost:8000")
+    parser.add_argument("--monitor", required=True, help="monitor id（模糊匹配，如摄像头 IP）")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--days", type=int, default=30, help="每次 /history 查询的天数")
+    parser.add_argument("--seconds", type=float, default=20, help="每个阶段的时长")
+    args = parser.parse_args()
+
+    monitor_base = f"{args.base}/monitor/{urllib.parse.quote(args.monitor, safe='')}"
+    now = int(time.time())
+    query_urls = [
+        f"{monitor_base}/history?start_date_ts={now - args.days * 86400}&end_date_ts={now}",
+        f"{monitor_base}/health_metrics?days={min(args.days, 366)}",
+    ]
+
+    watcher = FrameWatcher(f"{monitor_base}/video_feed?raw=true")
+    watcher.start()
+    time.sleep(2)  # 等视频流稳定
+
+    print(f"[LoadTest] 基线阶段 {args.seconds}s ...")
+    baseline_start = time.perf_counter()
+    time.sleep(args.seconds)
+    baseline_end = time.perf_counter()
+
+    print(f"[LoadTest] 压测阶段 {args.seconds}s，{args.concurrency} 个并发查询 ...")
+    stop = threading.Event()
+    latencies, errors = [], []
+    workers = [threading.Thread(target=query_worker, args=(query_urls, stop, latencies, errors), daemon=True)
+               for _ in range(args.concurrency)]
+    load_start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(args.seconds)
+    load_end = time.perf_counter()
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    print("[LoadTest] 结果:")
+    report("基线", watcher.intervals(baseline_start, baseline_end))
+    report("压测", watcher.intervals(load_start, load_end))
+    print(f"  查询: {len(latencies)} 次 ({len(latencies) / args.seconds:.1f}/s), "
+          f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+          f"错误 {len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
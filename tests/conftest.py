@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# database 包导入时就会建表，必须在导入前指向临时库（无条件覆盖，不能写进开发者导出的真实库）
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
@@ -0,0 +1,32 @@
+import importlib.util
+from pathlib import Path
+
+# 直接加载模块文件：导入 backend 包会连带加载摄像头、检测模型等重依赖
+_spec = importlib.util.spec_from_file_location(
+    "analytics", Path(__file__).resolve().parent.parent / "backend" / "analytics.py")
+analytics = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(analytics)
+
+
+def test_short_absence_does_not_reset_sitting():
+    health = analytics.HealthAnalytics()
+    start = 1_700_000_000
+    # 坐了 100 秒，其间每 10 秒漏检 2 秒
+    for second in range(100):
+        snapshot = health.update(start + second, second % 10 not in (3, 4), False, False)
+    assert snapshot.sitting_seconds == 99
+
+
+def test_long_absence_resets_sitting():
+    health = analytics.HealthAnalytics()
+    start = 1_700_000_000
+    for second in range(100):
+        health.update(start + second, True, False, False)
+    for second in range(100, 100 + analytics.ABSENCE_GRACE_SECONDS - 1):
+        snapshot = health.update(start + second, False, False, False)
+    assert snapshot.sitting_seconds > 0
+    snapshot = health.update(start + 100 + analytics.ABSENCE_GRACE_SECONDS - 1, False, False, False)
+    assert snapshot.sitting_seconds == 0
+    # 回来后重新计时
+    snapshot = health.update(start + 200, True, False, False)
+    assert snapshot.sitting_seconds == 0
@@ -0,0 +1,39 @@
+from database import crud
+from database.models import SessionLocal, StatusHour, StatusMinute, StatusSecondBlock
+from database.timeseries import POWER, MinuteBlock, rollup
+
+
+def write_block(monitor: str, minute_start: int, seconds: range, power: float):
+    block = MinuteBlock(monitor, minute_start)
+    for ts in seconds:
+        block.set(minute_start + ts, True, ts % 2 == 0, False, power)
+    db = SessionLocal()
+    try:
+        block.write(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_same_minute_written_twice_keeps_tables_consistent():
+    monitor = "udpserver://0.0.0.0:8099/test-twice"
+    minute_start = 1_700_000_040
+    # 停止时 flush 了前 20 秒，同一分钟内重启后写入后 40 秒
+    write_block(monitor, minute_start, range(0, 20), 10.0)
+    write_block(monitor, minute_start, range(20, 60), 20.0)
+
+    db = SessionLocal()
+    try:
+        monitor_id = crud.get_monitor_id(db, monitor, create=False)
+        second = db.query(StatusSecondBlock).filter(StatusSecondBlock.monitor_id == monitor_id).one()
+        minute = db.query(StatusMinute).filter(StatusMinute.monitor_id == monitor_id,
+                                               StatusMinute.ts == minute_start).one()
+        hour = db.query(StatusHour).filter(StatusHour.monitor_id == monitor_id,
+                                           StatusHour.ts == minute_start - minute_start % 3600).one()
+        expected = rollup(second.flags, POWER.unpack(second.power))
+        assert expected["samples"] == 60
+        assert expected["power_sum"] == 20 * 100 + 40 * 200
+        for row in (minute, hour):
+            assert {name: getattr(row, name) for name in expected} == expected
+    finally:
+        db.close()